@@ -0,0 +1,268 @@
+"""
+MaternalGuard — Prediction Audit Log
+Predictions are enqueued on a bounded in-memory queue and written to SQLite
+(WAL mode) in bulk by a background thread, keeping I/O off the request path.
+"""
+
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+AUDIT_DB_PATH = os.environ.get(
+    "MATERNALGUARD_AUDIT_DB",
+    os.path.join(os.path.dirname(__file__), "..", "audit", "predictions.db"),
+)
+
+QUEUE_MAXSIZE = 10_000
+FLUSH_BATCH_SIZE = 500
+FLUSH_INTERVAL_S = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    patient_id TEXT,
+    tenant_id TEXT,
+    model_version TEXT,
+    input TEXT NOT NULL,
+    scores TEXT NOT NULL,
+    top_factors TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions (ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_patient_ts ON predictions (patient_id, ts);
+"""
+
+_STOP = object()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class AuditLog:
+    def __init__(
+        self,
+        db_path: str = AUDIT_DB_PATH,
+        maxsize: int = QUEUE_MAXSIZE,
+        batch_size: int = FLUSH_BATCH_SIZE,
+        interval: float = FLUSH_INTERVAL_S,
+    ):
+        self.db_path = os.path.normpath(db_path)
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._schema_ready = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._ensure_schema()
+        self._thread = threading.Thread(target=self._writer, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Flush whatever is queued and stop the writer."""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            # A full queue drains as the writer flushes; don't wait on it forever
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print(f"✗ Audit queue still full after {timeout}s; {self._queue.qsize()} records not flushed")
+        else:
+            self._thread.join(max(deadline - time.monotonic(), 0))
+        self._thread = None
+
+    def _ensure_schema(self):
+        if self._schema_ready:
+            return
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = _connect(self.db_path)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        self._schema_ready = True
+
+    def record(
+        self,
+        patient_id: Optional[str],
+        patient_data: Dict[str, Any],
+        result: Dict[str, Any],
+        model_version: Optional[str],
+        tenant_id: Optional[str] = None,
+    ):
+        """Enqueue a prediction for auditing. Never blocks; drops when the queue is full."""
+        try:
+            self._queue.put_nowait((time.time(), patient_id, tenant_id, model_version, patient_data, result))
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer(self):
+        conn = _connect(self.db_path)
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            while True:
+                if item is _STOP:
+                    running = False
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._flush(conn, batch)
+                except Exception as e:
+                    # Never let one bad batch kill the writer
+                    self.failed_flushes += 1
+                    self.dropped += len(batch)
+                    print(f"✗ Audit flush failed ({len(batch)} records dropped): {e}")
+        conn.close()
+
+    def _flush(self, conn: sqlite3.Connection, batch: list):
+        started = time.perf_counter()
+        rows = []
+        for ts, patient_id, tenant_id, model_version, patient_data, result in batch:
+            try:
+                rows.append(
+                    (ts, patient_id, tenant_id, model_version, json.dumps(patient_data, default=_json_default),
+                     *_summarize(result))
+                )
+            except (TypeError, ValueError, KeyError) as e:
+                self.dropped += 1
+                print(f"✗ Audit record for patient {patient_id} dropped: {e}")
+        if not rows:
+            return
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO predictions (ts, patient_id, tenant_id, model_version, input, scores, top_factors) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as e:
+            self.failed_flushes += 1
+            self.dropped += len(rows)
+            print(f"✗ Audit flush failed ({len(rows)} records dropped): {e}")
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.written += len(rows)
+        self.flushes += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        patient_id: Optional[str] = None,
+        limit: int = 100,
+        tenant_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Audit records in [start, end) (epoch seconds), newest first."""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(end)
+        if patient_id is not None:
+            clauses.append("patient_id = ?")
+            params.append(patient_id)
+        if tenant_id is not None:
+            clauses.append("tenant_id = ?")
+            params.append(tenant_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        self._ensure_schema()
+        conn = _connect(self.db_path)
+        try:
+            cursor = conn.execute(
+                f"SELECT ts, patient_id, tenant_id, model_version, input, scores, top_factors "
+                f"FROM predictions {where} ORDER BY ts DESC LIMIT ?",
+                (*params, limit),
+            )
+            return [
+                {
+                    "timestamp": ts,
+                    "patient_id": pid,
+                    "tenant_id": tenant,
+                    "model_version": version,
+                    "input": json.loads(inp),
+                    "scores": json.loads(scores),
+                    "top_factors": json.loads(factors),
+                }
+                for ts, pid, tenant, version, inp, scores, factors in cursor
+            ]
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+            "writer_running": self._thread is not None and self._thread.is_alive(),
+        }
+
+
+def _json_default(value):
+    # numpy scalars from batch-prepared inputs
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _summarize(result: Dict[str, Any]):
+    """Serialize scores and top factors from a predict() response or a stream update."""
+    scores = {c["condition_key"]: c["risk_score"] for c in result["conditions"]}
+    top_factors = {
+        c["condition_key"]: [
+            {"feature_key": f["feature_key"], "shap_value": f["shap_value"]} for f in c.get("top_factors", [])
+        ]
+        for c in result["conditions"]
+    }
+    return json.dumps(scores, default=_json_default), json.dumps(top_factors, default=_json_default)
+
+
+# Singleton audit log
+audit_log = AuditLog()
@@ -0,0 +1,292 @@
+"""
+MaternalGuard — Cohort Analytics
+Bulk-scores patient datasets in chunks and serves precomputed population aggregates.
+"""
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional
+
+from app.prediction import (
+    engine,
+    MODEL_DIR,
+    TARGETS,
+    CONDITION_NAMES,
+    RISK_LEVELS,
+    categorize_risk_batch,
+)
+
+DATASET_PATH = os.path.join(MODEL_DIR, "synthetic_patients.csv")
+COHORT_STORE_PATH = os.path.join(MODEL_DIR, "cohort_aggregates.npz")
+# Patients posted to /api/cohort/patients, kept so a full rescore includes them
+ADDED_PATIENTS_PATH = os.path.join(MODEL_DIR, "cohort_added_patients.csv")
+
+GROUP_COLUMNS = ["race_ethnicity", "insurance_type"]
+UNKNOWN_GROUP = "Unknown"
+N_BINS = 20
+CHUNK_SIZE = 5000
+
+
+class CohortAggregates:
+    """Additive counters for risk distributions, overall and per subgroup."""
+
+    def __init__(self, group_labels: Dict[str, list], model_version: Optional[str]):
+        n_targets, n_levels = len(TARGETS), len(RISK_LEVELS)
+        self.model_version = model_version
+        self.rows = 0
+        self.source_rows = 0  # rows consumed from the dataset file
+        self.added_rows = 0  # rows consumed from the added-patients file
+        self.histograms = np.zeros((n_targets, N_BINS), dtype=np.int64)
+        self.category_counts = np.zeros((n_targets, n_levels), dtype=np.int64)
+        self.score_sums = np.zeros(n_targets)
+        self.group_labels = group_labels
+        self.group_counts = {}
+        self.group_score_sums = {}
+        self.group_category_counts = {}
+        for col, labels in group_labels.items():
+            self.group_counts[col] = np.zeros(len(labels), dtype=np.int64)
+            self.group_score_sums[col] = np.zeros((len(labels), n_targets))
+            self.group_category_counts[col] = np.zeros((len(labels), n_targets, n_levels), dtype=np.int64)
+
+    def update(self, probs: np.ndarray, groups: Dict[str, np.ndarray]):
+        """Fold a scored chunk into the counters.
+
+        probs has shape (len(TARGETS), n); groups maps each group column to
+        per-row indices into group_labels[col].
+        """
+        n_targets, n = probs.shape
+        n_levels = len(RISK_LEVELS)
+        target_idx = np.arange(n_targets)[:, None]
+
+        bins = np.minimum((probs * N_BINS).astype(np.int64), N_BINS - 1)
+        self.histograms += np.bincount(
+            (target_idx * N_BINS + bins).ravel(), minlength=n_targets * N_BINS
+        ).reshape(n_targets, N_BINS)
+
+        cats = categorize_risk_batch(probs)
+        self.category_counts += np.bincount(
+            (target_idx * n_levels + cats).ravel(), minlength=n_targets * n_levels
+        ).reshape(n_targets, n_levels)
+        self.score_sums += probs.sum(axis=1)
+
+        for col, g in groups.items():
+            n_groups = len(self.group_labels[col])
+            self.group_counts[col] += np.bincount(g, minlength=n_groups)
+            for t in range(n_targets):
+                self.group_score_sums[col][:, t] += np.bincount(g, weights=probs[t], minlength=n_groups)
+            flat = (g[None, :] * n_targets + target_idx) * n_levels + cats
+            self.group_category_counts[col] += np.bincount(
+                flat.ravel(), minlength=n_groups * n_targets * n_levels
+            ).reshape(n_groups, n_targets, n_levels)
+
+        self.rows += n
+
+    def save(self, path: str):
+        arrays = {
+            "model_version": np.array(self.model_version or ""),
+            "rows": np.array(self.rows),
+            "source_rows": np.array(self.source_rows),
+            "added_rows": np.array(self.added_rows),
+            "histograms": self.histograms,
+            "category_counts": self.category_counts,
+            "score_sums": self.score_sums,
+        }
+        for col in self.group_labels:
+            arrays[f"{col}__labels"] = np.array(self.group_labels[col])
+            arrays[f"{col}__counts"] = self.group_counts[col]
+            arrays[f"{col}__score_sums"] = self.group_score_sums[col]
+            arrays[f"{col}__category_counts"] = self.group_category_counts[col]
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CohortAggregates":
+        with np.load(path) as data:
+            group_labels = {col: data[f"{col}__labels"].tolist() for col in GROUP_COLUMNS}
+            agg = cls(group_labels, str(data["model_version"]) or None)
+            agg.rows = int(data["rows"])
+            agg.source_rows = int(data["source_rows"])
+            agg.added_rows = int(data["added_rows"]) if "added_rows" in data else 0
+            agg.histograms = data["histograms"]
+            agg.category_counts = data["category_counts"]
+            agg.score_sums = data["score_sums"]
+            for col in GROUP_COLUMNS:
+                agg.group_counts[col] = data[f"{col}__counts"]
+                agg.group_score_sums[col] = data[f"{col}__score_sums"]
+                agg.group_category_counts[col] = data[f"{col}__category_counts"]
+        return agg
+
+
+class CohortAnalytics:
+    """Keeps cohort aggregates in sync with the dataset and the loaded models."""
+
+    def __init__(
+        self,
+        dataset_path: str = DATASET_PATH,
+        store_path: str = COHORT_STORE_PATH,
+        added_path: str = ADDED_PATIENTS_PATH,
+    ):
+        self.dataset_path = dataset_path
+        self.store_path = store_path
+        self.added_path = added_path
+        self._aggregates: Optional[CohortAggregates] = None
+        self._summary: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _group_labels(self) -> Dict[str, list]:
+        return {
+            col: [str(c) for c in engine.label_encoders[col].classes_] + [UNKNOWN_GROUP]
+            for col in GROUP_COLUMNS
+        }
+
+    def _group_indices(self, df: pd.DataFrame, agg: CohortAggregates) -> Dict[str, np.ndarray]:
+        groups = {}
+        for col in GROUP_COLUMNS:
+            labels = agg.group_labels[col]
+            codes = pd.Categorical(df[col].astype(str), categories=labels[:-1]).codes
+            groups[col] = np.where(codes < 0, len(labels) - 1, codes).astype(np.int64)
+        return groups
+
+    def _score_into(self, df: pd.DataFrame, agg: CohortAggregates):
+        X = engine._prepare_batch(df)
+        agg.update(engine.predict_proba_batch(X), self._group_indices(df, agg))
+
+    def _score_new_rows(self, path: str, skip: int, agg: CohortAggregates) -> int:
+        """Score rows of a CSV past the first `skip`; returns how many were scored."""
+        if not _has_header(path):
+            return 0
+        scored = 0
+        for chunk in pd.read_csv(path, chunksize=CHUNK_SIZE, skiprows=range(1, skip + 1)):
+            if chunk.empty:
+                continue
+            self._score_into(chunk, agg)
+            scored += len(chunk)
+        return scored
+
+    def refresh(self) -> CohortAggregates:
+        """Bring aggregates up to date, scoring only what changed.
+
+        A new model version triggers a full rescore of the dataset and of
+        every added patient; otherwise only rows appended since the last
+        refresh are scored.
+        """
+        with self._lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> CohortAggregates:
+        if not engine._loaded:
+            engine.load_models()
+
+        agg = self._aggregates
+        if agg is None and os.path.exists(self.store_path):
+            agg = CohortAggregates.load(self.store_path)
+        if agg is None or agg.model_version != engine.model_version:
+            agg = CohortAggregates(self._group_labels(), engine.model_version)
+
+        source_rows = self._score_new_rows(self.dataset_path, agg.source_rows, agg)
+        added_rows = self._score_new_rows(self.added_path, agg.added_rows, agg)
+        agg.source_rows += source_rows
+        agg.added_rows += added_rows
+        new_rows = source_rows + added_rows
+
+        if new_rows or agg is not self._aggregates:
+            agg.save(self.store_path)
+            self._summary = None
+        self._aggregates = agg
+        if new_rows:
+            print(f"✓ Cohort aggregates updated (+{new_rows} rows, {agg.rows} total)")
+        return agg
+
+    def add_patients(self, patients: pd.DataFrame) -> int:
+        """Persist newly arrived patients (not in the dataset file), fold them into
+        the aggregates, and return the cohort size."""
+        with self._lock:
+            if patients.empty:
+                return self._aggregates.rows if self._aggregates is not None else 0
+            # A side file without a header (e.g. left empty) has nothing to align to; start it over
+            if _has_header(self.added_path):
+                columns = pd.read_csv(self.added_path, nrows=0).columns
+                patients.reindex(columns=columns).to_csv(self.added_path, mode="a", header=False, index=False)
+            else:
+                patients.to_csv(self.added_path, index=False)
+            return self._refresh_locked().rows
+
+    def summary(self) -> Dict[str, Any]:
+        """Precomputed dashboard payload; rebuilt only when aggregates change.
+
+        Built and cached under the same lock that refresh/add_patients hold
+        while updating the aggregates in place, so it is never a torn read.
+        """
+        with self._lock:
+            if (
+                self._summary is not None
+                and self._aggregates is not None
+                and self._aggregates.model_version == engine.model_version
+            ):
+                return self._summary
+
+            self._summary = _build_summary(self._refresh_locked())
+            return self._summary
+
+
+def _has_header(path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    with open(path) as f:
+        return bool(f.readline().strip())
+
+
+def _shares(counts: np.ndarray) -> Dict[str, Dict[str, float]]:
+    total = max(int(counts.sum()), 1)
+    return {
+        level: {"count": int(c), "share": round(int(c) / total, 4)}
+        for level, c in zip(RISK_LEVELS, counts)
+    }
+
+
+def _build_summary(agg: CohortAggregates) -> Dict[str, Any]:
+    rows = max(agg.rows, 1)
+    outcomes = []
+    for t, target in enumerate(TARGETS):
+        outcomes.append({
+            "condition": CONDITION_NAMES[target],
+            "condition_key": target,
+            "mean_risk": round(float(agg.score_sums[t] / rows), 4),
+            "histogram": agg.histograms[t].tolist(),
+            "risk_distribution": _shares(agg.category_counts[t]),
+        })
+
+    breakdowns = {}
+    for col, labels in agg.group_labels.items():
+        groups = []
+        for g, label in enumerate(labels):
+            count = int(agg.group_counts[col][g])
+            if count == 0:
+                continue
+            groups.append({
+                "group": label,
+                "count": count,
+                "outcomes": {
+                    target: {
+                        "mean_risk": round(float(agg.group_score_sums[col][g, t] / count), 4),
+                        "risk_distribution": _shares(agg.group_category_counts[col][g, t]),
+                    }
+                    for t, target in enumerate(TARGETS)
+                },
+            })
+        breakdowns[col] = groups
+
+    return {
+        "model_version": agg.model_version,
+        "patients": agg.rows,
+        "histogram_bins": np.linspace(0, 1, N_BINS + 1).round(4).tolist(),
+        "outcomes": outcomes,
+        "breakdowns": breakdowns,
+    }
+
+
+# Singleton analytics store
+cohort = CohortAnalytics()
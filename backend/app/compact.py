@@ -0,0 +1,225 @@
+"""
+MaternalGuard — Compact Input Format
+Positional (fixed feature order) ingestion for machine clients: JSON arrays or
+struct-packed float32 binary, validated as whole NumPy matrices and fed to the
+engine already encoded, skipping per-field Pydantic validation.
+"""
+
+import struct
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List
+
+from app.prediction import engine, PredictionEngine, CATEGORICAL_FEATURES
+
+SCHEMA_VERSION = 1
+MAX_ROWS = 10_000
+MAX_REPORTED_ERRORS = 50
+
+# Binary payload: header followed by n_rows * n_features little-endian float32
+# values, row-major in schema order.
+BINARY_MAGIC = b"MGPD"
+BINARY_HEADER = struct.Struct("<4sHHI")  # magic, schema version, n_features, n_rows
+# Significant decimal digits a float32 carries; binary values are decoded at this precision
+FLOAT32_DIGITS = 7
+
+# Accepted (min, max, integer-valued) per feature. Categorical bounds come from
+# the label encoders at validation time.
+FEATURE_BOUNDS = {
+    "age": (10, 60, True),
+    "bmi_pre_pregnancy": (10.0, 80.0, False),
+    "gravidity": (0, 20, True),
+    "parity": (0, 20, True),
+    "previous_cesarean": (0, 1, True),
+    "previous_pph": (0, 1, True),
+    "previous_preeclampsia": (0, 1, True),
+    "gestational_age_at_delivery": (20, 45, True),
+    "multiple_gestation": (0, 1, True),
+    "systolic_bp": (50, 260, True),
+    "diastolic_bp": (30, 180, True),
+    "heart_rate": (30, 220, True),
+    "temperature": (90.0, 110.0, False),
+    "respiratory_rate": (5, 60, True),
+    "hemoglobin": (3.0, 22.0, False),
+    "platelet_count": (5, 1000, True),
+    "white_blood_cell_count": (0.5, 60.0, False),
+    "creatinine": (0.1, 15.0, False),
+    "ast_level": (1, 5000, True),
+    "alt_level": (1, 5000, True),
+    "blood_glucose": (20, 800, True),
+    "chronic_hypertension": (0, 1, True),
+    "pregestational_diabetes": (0, 1, True),
+    "gestational_diabetes": (0, 1, True),
+    "anemia_during_pregnancy": (0, 1, True),
+    "uterine_fibroids": (0, 1, True),
+    "placenta_previa": (0, 1, True),
+    "placental_abruption": (0, 1, True),
+    "chorioamnionitis": (0, 1, True),
+    "autoimmune_disorder": (0, 1, True),
+    "labor_induction": (0, 1, True),
+    "labor_augmentation_oxytocin": (0, 1, True),
+    "epidural_anesthesia": (0, 1, True),
+    "general_anesthesia": (0, 1, True),
+    "perineal_laceration_degree": (0, 4, True),
+    "estimated_blood_loss_ml": (0, 10000, True),
+    "newborn_weight_g": (200, 7000, True),
+    "labor_duration_hours": (0.0, 100.0, False),
+    "smoking_during_pregnancy": (0, 1, True),
+    "substance_use": (0, 1, True),
+    "prenatal_visits_count": (0, 50, True),
+    "distance_to_hospital_miles": (0.0, 1000.0, False),
+}
+
+
+class CompactFormatError(ValueError):
+    """Malformed or out-of-range compact payload; `errors` lists offending cells."""
+
+    def __init__(self, message: str, errors: List[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+_bounds_cache = {}
+
+
+def _bounds(eng: PredictionEngine):
+    """Per-column (lo, hi, is_int) arrays in eng.feature_names order."""
+    cache_key = (id(eng.label_encoders), tuple(eng.feature_names))
+    if cache_key in _bounds_cache:
+        return _bounds_cache[cache_key]
+
+    lo, hi, is_int = [], [], []
+    for fname in eng.feature_names:
+        if fname in CATEGORICAL_FEATURES:
+            bounds = (0, len(eng.label_encoders[fname].classes_) - 1, True)
+        else:
+            bounds = FEATURE_BOUNDS.get(fname, (-np.inf, np.inf, False))
+        lo.append(bounds[0])
+        hi.append(bounds[1])
+        is_int.append(bounds[2])
+    arrays = (np.array(lo, dtype=np.float64), np.array(hi, dtype=np.float64), np.array(is_int))
+    if len(_bounds_cache) >= 32:
+        _bounds_cache.clear()
+    _bounds_cache[cache_key] = arrays
+    return arrays
+
+
+def schema(eng: PredictionEngine = engine) -> Dict[str, Any]:
+    """Feature order, types, ranges and category codes for compact clients."""
+    if not eng._loaded:
+        eng.load_models()
+    lo, hi, is_int = _bounds(eng)
+    features = []
+    for j, fname in enumerate(eng.feature_names):
+        feature = {
+            "index": j,
+            "name": fname,
+            "type": "categorical" if fname in CATEGORICAL_FEATURES else ("int" if is_int[j] else "float"),
+            "min": float(lo[j]),
+            "max": float(hi[j]),
+        }
+        if fname in CATEGORICAL_FEATURES:
+            feature["categories"] = [str(c) for c in eng.label_encoders[fname].classes_]
+        features.append(feature)
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "n_features": len(features),
+        "max_rows": MAX_ROWS,
+        "features": features,
+        "binary": {
+            "content_type": "application/octet-stream",
+            "header": "little-endian struct '<4sHHI': magic 'MGPD', schema_version, n_features, n_rows",
+            "body": "n_rows * n_features float32 (little-endian), row-major in feature order",
+        },
+    }
+
+
+def _check_shape(X: np.ndarray, eng: PredictionEngine) -> np.ndarray:
+    n_features = len(eng.feature_names)
+    if X.ndim != 2 or X.shape[1] != n_features:
+        raise CompactFormatError(f"Each row must have exactly {n_features} values")
+    if len(X) == 0:
+        raise CompactFormatError("Payload contains no rows")
+    if len(X) > MAX_ROWS:
+        raise CompactFormatError(f"At most {MAX_ROWS} rows per request")
+    return X
+
+
+def decode_json(payload: Dict[str, Any], eng: PredictionEngine = engine) -> np.ndarray:
+    """{"schema_version": 1, "rows": [[...], ...]} → float64 matrix."""
+    if not isinstance(payload, dict):
+        raise CompactFormatError("Payload must be an object with schema_version and rows")
+    if payload.get("schema_version") != SCHEMA_VERSION:
+        raise CompactFormatError(f"Unsupported schema_version (expected {SCHEMA_VERSION})")
+    try:
+        X = np.asarray(payload.get("rows"), dtype=np.float64)
+    except (TypeError, ValueError):
+        raise CompactFormatError("rows must be a rectangular array of numbers")
+    return _check_shape(X, eng)
+
+
+def decode_binary(body: bytes, eng: PredictionEngine = engine) -> np.ndarray:
+    """Header + packed float32 rows → float64 matrix, same values as the JSON path."""
+    if len(body) < BINARY_HEADER.size:
+        raise CompactFormatError("Payload shorter than header")
+    magic, version, n_features, n_rows = BINARY_HEADER.unpack_from(body)
+    if magic != BINARY_MAGIC:
+        raise CompactFormatError("Bad magic (expected b'MGPD')")
+    if version != SCHEMA_VERSION:
+        raise CompactFormatError(f"Unsupported schema_version (expected {SCHEMA_VERSION})")
+    expected = BINARY_HEADER.size + 4 * n_features * n_rows
+    if len(body) != expected:
+        raise CompactFormatError(f"Payload is {len(body)} bytes, header implies {expected}")
+    X = np.frombuffer(body, dtype="<f4", offset=BINARY_HEADER.size).reshape(n_rows, n_features)
+    return _check_shape(_float32_to_decimal(X), eng)
+
+
+def _float32_to_decimal(X: np.ndarray) -> np.ndarray:
+    """float32 → float64 rounded to FLOAT32_DIGITS significant digits, so a
+    client's 25.4 decodes as 25.4 rather than 25.399999618530273."""
+    X = X.astype(np.float64)
+    finite = np.isfinite(X) & (X != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        magnitude = np.floor(np.log10(np.abs(X)))
+    scale = 10.0 ** np.where(finite, FLOAT32_DIGITS - 1 - magnitude, 0)
+    return np.where(finite, np.round(X * scale) / scale, X)
+
+
+def encode_binary(X: np.ndarray) -> bytes:
+    """Client-side helper: pack an (n_rows, n_features) matrix."""
+    X = np.ascontiguousarray(X, dtype="<f4")
+    return BINARY_HEADER.pack(BINARY_MAGIC, SCHEMA_VERSION, X.shape[1], X.shape[0]) + X.tobytes()
+
+
+def validate(X: np.ndarray, eng: PredictionEngine = engine):
+    """Range, finiteness and integer checks over the whole matrix at once."""
+    lo, hi, is_int = _bounds(eng)
+    finite = np.isfinite(X)
+    with np.errstate(invalid="ignore"):
+        out_of_range = (X < lo) | (X > hi)
+        not_integer = is_int & (X != np.round(X))
+    bad = ~finite | out_of_range | not_integer
+    if not bad.any():
+        return
+
+    rows, cols = np.nonzero(bad)
+    errors = []
+    for r, c in zip(rows[:MAX_REPORTED_ERRORS], cols[:MAX_REPORTED_ERRORS]):
+        if not finite[r, c]:
+            reason = "not a finite number"
+        elif out_of_range[r, c]:
+            reason = f"outside [{lo[c]:g}, {hi[c]:g}]"
+        else:
+            reason = "must be an integer"
+        errors.append({
+            "row": int(r),
+            "feature": eng.feature_names[c],
+            "value": float(X[r, c]) if finite[r, c] else str(X[r, c]),
+            "reason": reason,
+        })
+    raise CompactFormatError(f"{len(rows)} invalid value(s)", errors)
+
+
+def to_frame(X: np.ndarray, eng: PredictionEngine = engine) -> pd.DataFrame:
+    """Validated positional matrix → encoded model input (no per-field work)."""
+    return pd.DataFrame(X, columns=eng.feature_names, copy=False)
@@ -0,0 +1,211 @@
+"""
+MaternalGuard — Counterfactual Search
+"What would lower this risk?" Beam search over clinically attainable values of
+modifiable features. Each depth expands the best candidates by one more
+feature change and scores all of them in a single vectorized model call, until
+the risk falls below the next lower category threshold or the evaluation
+budget runs out.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+from app.prediction import (
+    TARGETS,
+    CONDITION_NAMES,
+    FEATURE_EXPLANATIONS,
+    RISK_LEVELS,
+    RISK_THRESHOLDS,
+    categorize_risk,
+)
+from app.compact import FEATURE_BOUNDS
+
+# feature -> (attainable values, normal reference, scale used to normalize distances).
+# Only moves that bring a feature closer to its reference are proposed.
+MODIFIABLE_FEATURES = {
+    "hemoglobin": (np.arange(9.0, 14.01, 0.5), 12.5, 1.5),
+    "systolic_bp": (np.arange(100, 141, 5), 115, 15.0),
+    "diastolic_bp": (np.arange(60, 91, 5), 75, 10.0),
+    "heart_rate": (np.arange(60, 101, 5), 75, 12.0),
+    "temperature": (np.round(np.arange(97.6, 99.41, 0.2), 1), 98.6, 0.8),
+    "blood_glucose": (np.arange(70, 141, 10), 90, 25.0),
+    "labor_augmentation_oxytocin": (np.array([0]), 0, 1.0),
+}
+
+# Model evaluations allowed per request (split across targets when searching all)
+COUNTERFACTUAL_BUDGET = int(os.environ.get("MATERNALGUARD_CF_BUDGET", "5000"))
+MAX_COUNTERFACTUAL_BUDGET = 50_000
+BEAM_WIDTH = 20
+MAX_CHANGES = 3
+
+
+class CounterfactualSearch:
+    def __init__(self, budget: int = COUNTERFACTUAL_BUDGET, beam_width: int = BEAM_WIDTH, max_changes: int = MAX_CHANGES):
+        self.budget = budget
+        self.beam_width = beam_width
+        self.max_changes = max_changes
+
+    def explain(
+        self,
+        eng,
+        patient_data: Dict[str, Any],
+        target: Optional[str] = None,
+        k: int = 5,
+        budget: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Counterfactuals for one target, or for every target above low risk."""
+        if target is not None and target not in TARGETS:
+            raise KeyError(f"Unknown target: {target}")
+        if not eng._loaded:
+            eng.load_models()
+        budget = min(budget or self.budget, MAX_COUNTERFACTUAL_BUDGET)
+
+        X = eng._prepare_input(patient_data)
+        x = X.to_numpy(dtype=np.float64)[0]
+        if target is not None:
+            targets = [target]
+        else:
+            probs = eng.predict_proba_batch(X)[:, 0]
+            targets = [t for t, p in zip(TARGETS, probs) if categorize_risk(float(p)) != "low"]
+
+        conditions = [
+            self._search(eng, x, t, k, budget // len(targets)) for t in targets
+        ] if targets else []
+        return {
+            "conditions": conditions,
+            "evaluations": sum(c["evaluations"] for c in conditions),
+            "budget": budget,
+        }
+
+    def _search(self, eng, x: np.ndarray, target: str, k: int, budget: int) -> Dict[str, Any]:
+        names = eng.feature_names
+        model = eng.models[target]
+
+        def score(rows: np.ndarray) -> np.ndarray:
+            return model.predict_proba(pd.DataFrame(rows, columns=names))[:, 1]
+
+        prob = float(score(x[None])[0])
+        level = RISK_LEVELS.index(categorize_risk(prob))
+        result = {
+            "condition": CONDITION_NAMES[target],
+            "condition_key": target,
+            "risk_score": round(prob, 4),
+            "risk_category": RISK_LEVELS[level],
+            "goal": None,
+            "evaluations": 1,
+            "budget_exhausted": False,
+            "counterfactuals": [],
+        }
+        if level == 0:
+            return result
+        goal = RISK_THRESHOLDS[level - 1]
+        result["goal"] = {"risk_category": RISK_LEVELS[level - 1], "risk_score_below": goal}
+
+        # Every single-feature move toward normal: (column, value) pairs
+        cols, vals = [], []
+        scales = np.ones(len(names))
+        for fname, (grid, normal, scale) in MODIFIABLE_FEATURES.items():
+            if fname not in names:
+                continue
+            j = names.index(fname)
+            scales[j] = scale
+            for v in grid:
+                if abs(v - normal) < abs(x[j] - normal):
+                    cols.append(j)
+                    vals.append(float(v))
+        move_cols, move_vals = np.array(cols, dtype=np.intp), np.array(vals)
+
+        beam = x[None]
+        beam_changed = np.zeros((1, len(names)), dtype=bool)
+        found_rows, found_changed, found_probs = [], [], []
+        evaluations = 1
+
+        for _ in range(self.max_changes):
+            remaining = budget - evaluations
+            if remaining <= 0 or len(beam) == 0 or len(move_cols) == 0:
+                break
+
+            # Expand each beam row by every move on a feature it hasn't changed yet
+            b_idx = np.repeat(np.arange(len(beam)), len(move_cols))
+            m_idx = np.tile(np.arange(len(move_cols)), len(beam))
+            keep = ~beam_changed[b_idx, move_cols[m_idx]]
+            b_idx, m_idx = b_idx[keep], m_idx[keep]
+            rows = np.arange(len(b_idx))
+            cands = beam[b_idx]
+            cands[rows, move_cols[m_idx]] = move_vals[m_idx]
+            changed = beam_changed[b_idx]
+            changed[rows, move_cols[m_idx]] = True
+
+            # A+B and B+A are the same candidate; children of the best parents come first
+            _, first = np.unique(cands, axis=0, return_index=True)
+            first = np.sort(first)
+            if len(first) > remaining:
+                result["budget_exhausted"] = True
+                first = first[:remaining]
+            cands, changed = cands[first], changed[first]
+
+            probs = score(cands)
+            evaluations += len(cands)
+
+            hit = probs < goal
+            found_rows.append(cands[hit])
+            found_changed.append(changed[hit])
+            found_probs.append(probs[hit])
+
+            order = np.argsort(probs[~hit], kind="stable")[: self.beam_width]
+            beam, beam_changed = cands[~hit][order], changed[~hit][order]
+
+        result["evaluations"] = evaluations
+        if found_rows:
+            result["counterfactuals"] = self._rank(
+                eng, x, np.vstack(found_rows), np.vstack(found_changed), np.concatenate(found_probs), scales, k
+            )
+        return result
+
+    def _rank(self, eng, x, rows, changed, probs, scales, k) -> List[Dict[str, Any]]:
+        """Closest solutions first, minimal ones only: a candidate is dropped when
+        its changed features include every feature of an already kept solution
+        (same set or a strict superset), whatever values it uses."""
+        distance = (np.abs(rows - x) / scales).sum(axis=1)
+        n_changes = changed.sum(axis=1)
+        kept: List[int] = []
+        # Fewest changes first, then closest, so the kept solution is the best of its set
+        for i in np.lexsort((distance, n_changes)):
+            if any(not (changed[j] & ~changed[i]).any() for j in kept):
+                continue
+            kept.append(i)
+        kept.sort(key=lambda i: distance[i])
+        kept = kept[:k]
+        if not kept:
+            return []
+
+        # Side effects: what each option does to the other conditions
+        all_probs = eng.predict_proba_batch(pd.DataFrame(rows[kept], columns=eng.feature_names))
+        names = eng.feature_names
+        options = []
+        for n, i in enumerate(kept):
+            changes = []
+            for j in np.flatnonzero(changed[i]):
+                fname = names[j]
+                is_int = FEATURE_BOUNDS.get(fname, (0, 0, False))[2]
+                cast = int if is_int else (lambda v: round(float(v), 2))
+                changes.append({
+                    "feature": FEATURE_EXPLANATIONS.get(fname, {}).get("display", fname),
+                    "feature_key": fname,
+                    "from": cast(x[j]),
+                    "to": cast(rows[i][j]),
+                })
+            options.append({
+                "changes": changes,
+                "distance": round(float(distance[i]), 3),
+                "risk_score": round(float(probs[i]), 4),
+                "risk_category": categorize_risk(float(probs[i])),
+                "all_risks": {t: round(float(all_probs[t_idx, n]), 4) for t_idx, t in enumerate(TARGETS)},
+            })
+        return options
+
+
+# Singleton search
+counterfactual_search = CounterfactualSearch()
@@ -0,0 +1,123 @@
+"""
+MaternalGuard — Request Deadlines
+Counters for deadline-bound predictions: how often SHAP explanations had to be
+skipped to answer in time, per target, and how often the deadline was missed
+anyway (probabilities are always computed), plus the SHAP cost model the
+scheduler uses to decide what fits.
+"""
+
+import time
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Smoothing for the per-target SHAP cost estimate (weight of the newest sample)
+SHAP_COST_ALPHA = 0.2
+# Batch-size buckets (lower bounds). Per-row cost differs a lot between single
+# rows (fixed overhead dominates), small batches and parallel-executor batches.
+SHAP_COST_BUCKETS = [1, 2, 16, 256]
+# Each skip shrinks the estimate it was based on, so a target skipped after a
+# transient slowdown is eventually retried and re-measured instead of starving
+SHAP_COST_SKIP_DECAY = 0.05
+
+
+def deadline_from_ms(budget_ms: Optional[float], started: Optional[float] = None) -> Optional[float]:
+    """Absolute perf_counter() deadline for a budget relative to `started` (default: now)."""
+    if budget_ms is None:
+        return None
+    return (started if started is not None else time.perf_counter()) + budget_ms / 1000.0
+
+
+class ShapCostModel:
+    """EMA of SHAP seconds per row, per target and batch-size bucket."""
+
+    def __init__(
+        self,
+        alpha: float = SHAP_COST_ALPHA,
+        buckets: List[int] = SHAP_COST_BUCKETS,
+        skip_decay: float = SHAP_COST_SKIP_DECAY,
+    ):
+        self.alpha = alpha
+        self.buckets = list(buckets)
+        self.skip_decay = skip_decay
+        self._per_row: Dict[Tuple[str, int], float] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, n_rows: int) -> int:
+        return bisect.bisect_right(self.buckets, max(n_rows, 1)) - 1
+
+    def _key(self, target: str, n_rows: int) -> Optional[Tuple[str, int]]:
+        """Measured bucket closest to n_rows (ties go to the smaller, costlier-per-row bucket)."""
+        b = self._bucket(n_rows)
+        for candidate in sorted(range(len(self.buckets)), key=lambda c: (abs(c - b), c)):
+            if (target, candidate) in self._per_row:
+                return target, candidate
+        return None
+
+    def observe(self, target: str, n_rows: int, seconds: float):
+        key = (target, self._bucket(n_rows))
+        per_row = seconds / max(n_rows, 1)
+        with self._lock:
+            previous = self._per_row.get(key)
+            self._per_row[key] = per_row if previous is None else previous + self.alpha * (per_row - previous)
+
+    def estimate(self, target: str, n_rows: int) -> float:
+        """Estimated seconds to explain n_rows; 0 until the target has been measured."""
+        with self._lock:
+            key = self._key(target, n_rows)
+            return self._per_row[key] * n_rows if key is not None else 0.0
+
+    def skipped(self, target: str, n_rows: int):
+        with self._lock:
+            key = self._key(target, n_rows)
+            if key is not None:
+                self._per_row[key] *= 1 - self.skip_decay
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """ms per row by target and bucket label (e.g. "2-15", "256+")."""
+        labels = [
+            str(lo) if hi == lo + 1 else (f"{lo}-{hi - 1}" if hi else f"{lo}+")
+            for lo, hi in zip(self.buckets, self.buckets[1:] + [None])
+        ]
+        with self._lock:
+            result: Dict[str, Dict[str, float]] = {}
+            for (target, b), per_row in sorted(self._per_row.items()):
+                result.setdefault(target, {})[labels[b]] = round(per_row * 1000, 3)
+            return result
+
+
+class DeadlineStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.degraded = 0
+        self.unexplained = 0
+        self.missed = 0
+        self.skipped: Dict[str, int] = {}
+
+    def record(self, targets: List[str], skipped: List[str], missed: bool):
+        with self._lock:
+            self.requests += 1
+            if skipped:
+                self.degraded += 1
+                if len(skipped) == len(targets):
+                    self.unexplained += 1
+            if missed:
+                self.missed += 1
+            for target in skipped:
+                self.skipped[target] = self.skipped.get(target, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "degraded": self.degraded,
+                "degraded_rate": round(self.degraded / self.requests, 4) if self.requests else 0.0,
+                "unexplained": self.unexplained,
+                "deadline_missed": self.missed,
+                "skipped_by_target": dict(self.skipped),
+            }
+
+
+# Singleton counters (shared by every tenant engine)
+deadline_stats = DeadlineStats()
@@ -0,0 +1,124 @@
+"""
+MaternalGuard — Feature Drift Monitor
+Constant-memory per-feature histograms updated on every prediction, scored
+periodically (PSI and binned KS) against the training baseline saved by
+ml/train_model.py.
+"""
+
+import os
+import time
+import asyncio
+import threading
+import numpy as np
+import pandas as pd
+import joblib
+from typing import Any, Dict, Optional
+
+from app.prediction import MODEL_DIR, FEATURE_EXPLANATIONS
+
+DRIFT_BASELINE_PATH = os.path.join(MODEL_DIR, "drift_baseline.joblib")
+DRIFT_INTERVAL_S = 60
+# Each scoring pass multiplies live counts by this, so old traffic fades out
+DRIFT_DECAY = 0.9
+MIN_SAMPLES = 100
+
+PSI_MODERATE = 0.1
+PSI_MAJOR = 0.25
+PSI_EPSILON = 1e-4
+
+
+class DriftMonitor:
+    def __init__(self, baseline_path: str = DRIFT_BASELINE_PATH, interval: float = DRIFT_INTERVAL_S):
+        self.baseline_path = baseline_path
+        self.interval = interval
+        self.baseline: Optional[Dict[str, Any]] = None
+        self.counts: Optional[np.ndarray] = None
+        self.observed = 0
+        self._lock = threading.Lock()
+        self._task = None
+        self._report: Optional[Dict[str, Any]] = None
+
+    def load(self) -> bool:
+        if not os.path.exists(self.baseline_path):
+            print(f"✗ Drift baseline not found at {self.baseline_path} (retrain to create it)")
+            return False
+        baseline = joblib.load(self.baseline_path)
+        self.baseline = baseline
+        self.counts = np.zeros_like(baseline["proportions"], dtype=np.float64)
+        self._edges = baseline["edges"][None, :, :]
+        n_features, n_bins = baseline["proportions"].shape
+        self._offsets = np.arange(n_features) * n_bins
+        self._size = n_features * n_bins
+        return True
+
+    def observe(self, X: pd.DataFrame):
+        """Hot-path hook: bin each feature of each row and bump its counter."""
+        if self.baseline is None or list(X.columns) != self.baseline["feature_names"]:
+            return
+        values = X.to_numpy(dtype=np.float64)
+        bins = (values[:, :, None] > self._edges).sum(axis=2)
+        increments = np.bincount((bins + self._offsets).ravel(), minlength=self._size)
+        with self._lock:
+            self.counts += increments.reshape(self.counts.shape)
+            self.observed += len(values)
+
+    def start(self):
+        if self._task is None and self.baseline is not None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.compute(decay=True)
+            except Exception as e:
+                print(f"✗ Drift scoring failed: {e}")
+
+    def compute(self, decay: bool = False) -> Dict[str, Any]:
+        """Score live counts against the baseline (the periodic job also decays them)."""
+        if self.baseline is None:
+            return {"enabled": False, "detail": "No drift baseline available"}
+
+        with self._lock:
+            counts = self.counts.copy()
+            if decay:
+                self.counts *= DRIFT_DECAY
+        expected = self.baseline["proportions"]
+        n_effective = float(counts[0].sum()) if len(counts) else 0.0
+
+        features = []
+        if n_effective >= MIN_SAMPLES:
+            actual = counts / counts.sum(axis=1, keepdims=True)
+            a = np.clip(actual, PSI_EPSILON, None)
+            e = np.clip(expected, PSI_EPSILON, None)
+            psi = ((a - e) * np.log(a / e)).sum(axis=1)
+            ks = np.abs(np.cumsum(actual, axis=1) - np.cumsum(expected, axis=1)).max(axis=1)
+            for j in np.argsort(-psi):
+                fname = self.baseline["feature_names"][j]
+                features.append({
+                    "feature": FEATURE_EXPLANATIONS.get(fname, {}).get("display", fname),
+                    "feature_key": fname,
+                    "psi": round(float(psi[j]), 4),
+                    "ks": round(float(ks[j]), 4),
+                    "status": "major" if psi[j] >= PSI_MAJOR else ("moderate" if psi[j] >= PSI_MODERATE else "stable"),
+                })
+
+        report = {
+            "enabled": True,
+            "computed_at": time.time(),
+            "observed_total": self.observed,
+            "effective_samples": round(n_effective, 1),
+            "sufficient_data": n_effective >= MIN_SAMPLES,
+            "baseline_samples": self.baseline["n_samples"],
+            "drifted_features": sum(1 for f in features if f["status"] != "stable"),
+            "features": features,
+        }
+        self._report = report
+        return report
+
+    def report(self) -> Dict[str, Any]:
+        return self._report if self._report is not None else self.compute()
+
+
+# Singleton monitor
+drift_monitor = DriftMonitor()
@@ -0,0 +1,112 @@
+"""
+MaternalGuard — Parallel SHAP Executor
+Splits large batches into chunks and explains all targets concurrently on a
+thread pool. XGBoost computes TreeSHAP natively with the GIL released; each
+worker uses its own single-threaded copy of every model/explainer (kept in the
+engine's ModelStore, under its memory budget) so workers neither share mutable
+state nor oversubscribe cores. Results are written in place into one
+preallocated (targets, rows, features) array.
+
+Print scaling from 1 to N workers with:  python -m app.explain_pool
+"""
+
+import os
+import time
+import itertools
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+SHAP_WORKERS = int(os.environ.get("MATERNALGUARD_SHAP_WORKERS", os.cpu_count() or 1))
+SHAP_CHUNK_SIZE = 256
+# Below this many rows the pool overhead outweighs the gain
+PARALLEL_MIN_ROWS = 256
+
+
+class ExplanationExecutor:
+    def __init__(self, max_workers: int = SHAP_WORKERS, chunk_size: int = SHAP_CHUNK_SIZE):
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Worker slots 0..max_workers-1 key each thread's explainer copies in the store
+                slots = itertools.count()
+                self._pool = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="shap", initializer=self._init_worker, initargs=(slots,)
+                )
+            return self._pool
+
+    def _init_worker(self, slots):
+        self._local.slot = next(slots)
+
+    def _fill(self, out: np.ndarray, t: int, store, target: str, X: pd.DataFrame, start: int, stop: int):
+        explainer = store.worker_explainer(target, self._local.slot)
+        sv = explainer.shap_values(X.iloc[start:stop])
+        if isinstance(sv, list):
+            sv = sv[1]  # class 1 (positive)
+        out[t, start:stop] = sv
+
+    def explain(self, eng, X: pd.DataFrame, targets: List[str], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """SHAP values for every row and target, shape (len(targets), n_rows, n_features)."""
+        n_rows, n_features = X.shape
+        if out is None:
+            out = np.empty((len(targets), n_rows, n_features), dtype=np.float64)
+
+        # Resolve models in the caller's thread (lazy store loads happen once, here)
+        for target in targets:
+            eng.models[target]
+
+        pool = self._get_pool()
+        futures = [
+            pool.submit(self._fill, out, t, eng.store, targets[t], X, start, min(start + self.chunk_size, n_rows))
+            for t in range(len(targets))
+            for start in range(0, n_rows, self.chunk_size)
+        ]
+        for future in futures:
+            future.result()  # re-raise worker errors
+        return out
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+def benchmark(n_rows: int = 4000, max_workers: Optional[int] = None):
+    """Rows/sec explaining all targets, from 1 worker up to max_workers."""
+    from app.prediction import engine, MODEL_DIR, TARGETS
+
+    if not engine._loaded:
+        engine.load_models()
+    df = pd.read_csv(os.path.join(MODEL_DIR, "synthetic_patients.csv"), nrows=n_rows)
+    X = engine._prepare_batch(df)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    print(f"Explaining {len(X)} rows x {len(TARGETS)} targets ({os.cpu_count()} CPUs)")
+    print(f"{'workers':>8} {'seconds':>8} {'rows/s':>9} {'speedup':>8}")
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        executor = ExplanationExecutor(max_workers=workers)
+        executor.explain(engine, X.iloc[:executor.chunk_size * workers], TARGETS)  # warm per-thread explainers
+        started = time.perf_counter()
+        executor.explain(engine, X, TARGETS)
+        elapsed = time.perf_counter() - started
+        executor.shutdown()
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>8.2f} {len(X) / elapsed:>9.0f} {baseline / elapsed:>7.2f}x")
+
+
+# Singleton executor
+shap_executor = ExplanationExecutor()
+
+
+if __name__ == "__main__":
+    benchmark()
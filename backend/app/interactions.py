@@ -0,0 +1,122 @@
+"""
+MaternalGuard — SHAP Interaction Values
+Pairwise feature interactions for one patient (e.g. chronic hypertension ×
+systolic BP for preeclampsia), from XGBoost's native TreeSHAP interaction path.
+Roughly an order of magnitude costlier than plain SHAP, so per-target matrices
+are memoized in a bounded LRU keyed by the encoded input row.
+"""
+
+import os
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.prediction import TARGETS, CONDITION_NAMES, FEATURE_EXPLANATIONS
+
+INTERACTION_CACHE_SIZE = int(os.environ.get("MATERNALGUARD_INTERACTION_CACHE", "1024"))
+
+
+def _display(fname: str) -> str:
+    return FEATURE_EXPLANATIONS.get(fname, {}).get("display", fname)
+
+
+def _plain(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+
+class InteractionExplainer:
+    def __init__(self, maxsize: int = INTERACTION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def matrix(self, eng, target: str, X) -> Tuple[np.ndarray, bool]:
+        """(features x features) interaction matrix for a one-row encoded frame, and whether it was cached."""
+        row = np.ascontiguousarray(X.to_numpy(dtype=np.float64)[0])
+        key = (eng.model_dir, eng.model_version, target, hashlib.sha1(row.tobytes()).hexdigest())
+        with self._lock:
+            values = self._cache.get(key)
+            if values is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return values, True
+            self.misses += 1
+
+        values = eng.explainers[target].shap_interaction_values(X)
+        if isinstance(values, list):
+            values = values[1]  # class 1 (positive)
+        values = np.asarray(values[0], dtype=np.float32)
+
+        with self._lock:
+            self._cache[key] = values
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return values, False
+
+    def top_interactions(
+        self,
+        eng,
+        patient_data: Dict[str, Any],
+        targets: Optional[List[str]] = None,
+        k: int = 5,
+    ) -> Dict[str, Any]:
+        """Top-k off-diagonal interactions per target, strongest first."""
+        targets = targets or TARGETS
+        for target in targets:
+            if target not in TARGETS:
+                raise KeyError(f"Unknown target: {target}")
+        if not eng._loaded:
+            eng.load_models()
+
+        X = eng._prepare_input(patient_data)
+        names = eng.feature_names
+        upper_i, upper_j = np.triu_indices(len(names), k=1)
+
+        conditions = []
+        for target in targets:
+            values, cached = self.matrix(eng, target, X)
+            # Interaction effects are split symmetrically across (i, j) and (j, i)
+            pair_values = values[upper_i, upper_j] + values[upper_j, upper_i]
+            top = np.argsort(-np.abs(pair_values))[:k]
+
+            interactions = []
+            for p in top:
+                a, b = names[upper_i[p]], names[upper_j[p]]
+                value = float(pair_values[p])
+                interactions.append({
+                    "features": [_display(a), _display(b)],
+                    "feature_keys": [a, b],
+                    "values": [_plain(patient_data.get(a, 0)), _plain(patient_data.get(b, 0))],
+                    "interaction_value": round(value, 4),
+                    "direction": "increases_risk" if value > 0 else "decreases_risk",
+                })
+            conditions.append({
+                "condition": CONDITION_NAMES[target],
+                "condition_key": target,
+                "cached": cached,
+                "interactions": interactions,
+            })
+        return {"conditions": conditions}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Singleton explainer
+interaction_explainer = InteractionExplainer()
@@ -3,11 +3,29 @@ MaternalGuard — FastAPI Backend
 Single prediction endpoint with CORS for local development.
 """
 
-from fastapi import FastAPI, HTTPException
+import os
+import time
+import asyncio
+import pandas as pd
+from datetime import datetime
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Any, Dict, Optional
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, List, Optional
 from app.prediction import engine
+from app.cohort import cohort
+from app.shap_store import shap_store
+from app.similarity import similarity_index
+from app.streaming import risk_hub
+from app.audit import audit_log
+from app import compact
+from app.tenancy import engine_pool, UnknownTenantError
+from app.drift import drift_monitor
+from app.deadline import deadline_stats, deadline_from_ms
+from app.counterfactual import counterfactual_search
+from app.interactions import interaction_explainer
 
 app = FastAPI(
     title="MaternalGuard API",
@@ -25,10 +43,65 @@ app.add_middleware(
 )
 
 
+# Latency of this worker's first prediction request (set once by the middleware)
+first_request: Dict[str, Any] = {}
+PREDICTION_ROUTES = {"/api/predict", "/api/predict/compact", "/api/predict/binary"}
+
+
+@app.middleware("http")
+async def record_first_request(request: Request, call_next):
+    if first_request or request.method != "POST" or request.url.path not in PREDICTION_ROUTES:
+        return await call_next(request)
+    arrived_ready = engine.ready
+    started = time.perf_counter()
+    response = await call_next(request)
+    if not first_request:
+        first_request.update({
+            "path": request.url.path,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "arrived_before_ready": not arrived_ready,
+            "status_code": response.status_code,
+        })
+        print(f"✓ First prediction request served in {first_request['latency_ms']:.1f} ms")
+    return response
+
+
+def _log_failure(task: str):
+    """Done-callback for background startup work, which would otherwise fail silently."""
+    def callback(future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"✗ {task} failed: {future.exception()!r}")
+    return callback
+
+
 @app.on_event("startup")
 async def load_models():
-    """Load ML models on server startup."""
+    """Load ML models on server startup, then warm them up off the event loop.
+
+    /api/ready reports 503 until this worker's warm-up has finished.
+    """
     engine.load_models()
+    asyncio.get_running_loop().run_in_executor(None, engine.warm_up).add_done_callback(
+        _log_failure("Warm-up (/api/ready stays 503)")
+    )
+    # Precompute cohort aggregates in the background; /api/cohort/summary
+    # falls back to building them on demand if this hasn't finished yet.
+    asyncio.get_running_loop().run_in_executor(None, cohort.refresh).add_done_callback(
+        _log_failure("Cohort refresh")
+    )
+    risk_hub.start()
+    audit_log.start()
+    if drift_monitor.load():
+        # Default-model traffic only: the baseline describes the default model's
+        # training data, and tenant models have their own data and encodings
+        engine.input_observers.append(drift_monitor.observe)
+        drift_monitor.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Flush pending audit records before exit."""
+    audit_log.stop()
 
 
 class PatientData(BaseModel):
@@ -94,17 +167,349 @@ class PatientData(BaseModel):
 
 
 @app.post("/api/predict")
-async def predict(patient: PatientData):
-    """Run risk prediction for all 5 postpartum conditions."""
+async def predict(
+    patient: PatientData,
+    x_patient_id: Optional[str] = Header(None),
+    x_tenant_id: Optional[str] = Header(None),
+    x_deadline_ms: Optional[float] = Header(None),
+    deadline_ms: Optional[float] = None,
+):
+    """Run risk prediction for all 5 postpartum conditions.
+
+    An optional deadline (X-Deadline-Ms header or ?deadline_ms=) bounds the
+    response time: risk scores are always returned, but explanations that
+    would overrun are skipped and flagged (explanations_partial).
+    """
+    deadline = deadline_from_ms(x_deadline_ms if x_deadline_ms is not None else deadline_ms)
+    tenant_engine = await _tenant_engine(x_tenant_id)
     try:
         patient_dict = patient.model_dump()
-        result = engine.predict(patient_dict)
-        return result
+        result = tenant_engine.predict(patient_dict, deadline)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    audit_log.record(x_patient_id, patient_dict, result, tenant_engine.model_version, x_tenant_id)
+    return result
+
+
+async def _tenant_engine(tenant_id: Optional[str]):
+    # A cold tenant loads models and explainers from disk; keep that off the event loop
+    try:
+        return await run_in_threadpool(engine_pool.get, tenant_id)
+    except UnknownTenantError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+def _predict_compact(X, tenant_engine, tenant_id: Optional[str], deadline: Optional[float]) -> Dict[str, Any]:
+    compact.validate(X, tenant_engine)
+    results = tenant_engine.predict_encoded(compact.to_frame(X, tenant_engine), deadline=deadline)
+    for row, result in zip(X, results):
+        audit_log.record(
+            None,
+            {"schema_version": compact.SCHEMA_VERSION, "values": row.tolist()},
+            result,
+            tenant_engine.model_version,
+            tenant_id,
+        )
+    return {"schema_version": compact.SCHEMA_VERSION, "results": results}
+
+
+async def _run_compact(
+    decode, payload, tenant_id: Optional[str], deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    tenant_engine = await _tenant_engine(tenant_id)
+    try:
+        X = decode(payload, tenant_engine)
+        return await run_in_threadpool(_predict_compact, X, tenant_engine, tenant_id, deadline)
+    except compact.CompactFormatError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "errors": e.errors})
+
+
+@app.get("/api/predict/compact/schema")
+async def compact_schema(x_tenant_id: Optional[str] = Header(None)):
+    """Feature order, ranges and category codes for the positional formats."""
+    return compact.schema(await _tenant_engine(x_tenant_id))
+
+
+@app.post("/api/predict/compact")
+async def predict_compact(
+    request: Request,
+    x_tenant_id: Optional[str] = Header(None),
+    x_deadline_ms: Optional[float] = Header(None),
+):
+    """Batch prediction from positional JSON: {"schema_version": 1, "rows": [[...], ...]}."""
+    started = time.perf_counter()
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be JSON")
+    return await _run_compact(compact.decode_json, payload, x_tenant_id, deadline_from_ms(x_deadline_ms, started))
+
+
+@app.post("/api/predict/binary")
+async def predict_binary(
+    request: Request,
+    x_tenant_id: Optional[str] = Header(None),
+    x_deadline_ms: Optional[float] = Header(None),
+):
+    """Batch prediction from a struct-packed float32 payload (see compact schema)."""
+    started = time.perf_counter()
+    body = await request.body()
+    return await _run_compact(compact.decode_binary, body, x_tenant_id, deadline_from_ms(x_deadline_ms, started))
+
+
+@app.get("/api/cohort/summary")
+async def cohort_summary():
+    """Precomputed population risk distributions and subgroup breakdowns."""
+    return await run_in_threadpool(cohort.summary)
+
+
+@app.post("/api/cohort/refresh")
+async def cohort_refresh():
+    """Score rows appended to the cohort dataset since the last refresh."""
+    agg = await run_in_threadpool(cohort.refresh)
+    return {"patients": agg.rows, "model_version": agg.model_version}
+
+
+@app.post("/api/cohort/patients")
+async def cohort_add_patients(patients: List[PatientData]):
+    """Fold newly arrived patients into the cohort aggregates."""
+    if not patients:
+        raise HTTPException(status_code=400, detail="At least one patient is required")
+    df = pd.DataFrame([p.model_dump() for p in patients])
+    total = await run_in_threadpool(cohort.add_patients, df)
+    return {"added": len(patients), "patients": total}
+
+
+@app.post("/api/similar")
+async def similar_patients(patient: PatientData, k: int = 5, mode: str = "auto"):
+    """Most similar historical patients and their observed outcomes."""
+    if mode not in ("auto", "exact", "approx"):
+        raise HTTPException(status_code=400, detail=f"Unknown search mode: {mode}")
+    try:
+        return await run_in_threadpool(
+            similarity_index.similar_patients, patient.model_dump(), min(max(k, 1), 100), mode
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/api/counterfactual")
+async def counterfactual(
+    patient: PatientData,
+    target: Optional[str] = None,
+    k: int = 5,
+    budget: Optional[int] = None,
+    x_tenant_id: Optional[str] = Header(None),
+):
+    """Smallest changes to modifiable factors that drop a risk below its category threshold.
+
+    Without a target, every condition above low risk is searched and the
+    evaluation budget is split between them.
+    """
+    tenant_engine = await _tenant_engine(x_tenant_id)
+    try:
+        return await run_in_threadpool(
+            counterfactual_search.explain, tenant_engine, patient.model_dump(), target, min(max(k, 1), 20), budget
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+@app.post("/api/interactions")
+async def interactions(
+    patient: PatientData,
+    target: Optional[str] = None,
+    k: int = 5,
+    x_tenant_id: Optional[str] = Header(None),
+):
+    """Strongest pairwise SHAP interactions per condition (opt-in; costlier than /api/predict).
+
+    Results are cached per encoded patient, so repeat views are free.
+    """
+    tenant_engine = await _tenant_engine(x_tenant_id)
+    try:
+        return await run_in_threadpool(
+            interaction_explainer.top_interactions,
+            tenant_engine,
+            patient.model_dump(),
+            [target] if target else None,
+            min(max(k, 1), 50),
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+@app.get("/api/interactions/stats")
+async def interaction_stats():
+    """Interaction cache occupancy and hit rate."""
+    return interaction_explainer.stats()
+
+
+@app.websocket("/ws/risk")
+async def risk_stream(ws: WebSocket):
+    """Real-time risk updates for monitoring boards.
+
+    Client messages:
+      {"action": "subscribe", "patient_ids": [...]}
+      {"action": "unsubscribe", "patient_ids": [...]}
+      {"action": "update", "patient_id": "...", "data": {<PatientData fields>}}
+
+    Updates are merged into the patient's last known inputs; subscribers
+    receive a "risk_update" only when a score or risk category changes.
+    """
+    await ws.accept()
+    try:
+        while True:
+            try:
+                msg = await ws.receive_json()
+            except ValueError:
+                await ws.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+
+            action = msg.get("action") if isinstance(msg, dict) else None
+            if action in ("subscribe", "unsubscribe"):
+                patient_ids = _patient_ids(msg.get("patient_ids"))
+                if patient_ids is None:
+                    await ws.send_json({"type": "error", "detail": "patient_ids must be a list of ids"})
+                elif action == "subscribe":
+                    risk_hub.subscribe(ws, patient_ids)
+                    await ws.send_json({"type": "subscribed", "patient_ids": patient_ids})
+                else:
+                    risk_hub.unsubscribe(ws, patient_ids)
+            elif action == "update" and _is_scalar_id(msg.get("patient_id")):
+                patient_id = str(msg["patient_id"])
+                data = msg.get("data", {})
+                if not isinstance(data, dict):
+                    await ws.send_json({"type": "error", "patient_id": patient_id, "detail": "data must be an object"})
+                    continue
+                current = risk_hub.patients.get(patient_id, {})
+                try:
+                    patient = PatientData(**{**current, **data})
+                except (ValidationError, TypeError) as e:
+                    detail = e.errors(include_url=False, include_context=False) if isinstance(e, ValidationError) else str(e)
+                    await ws.send_json({"type": "error", "patient_id": patient_id, "detail": detail})
+                    continue
+                risk_hub.update(patient_id, patient.model_dump())
+            elif action == "update":
+                await ws.send_json({"type": "error", "detail": "update requires a string or integer patient_id"})
+            else:
+                await ws.send_json({"type": "error", "detail": f"Unknown action: {action}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # However the connection ends, stop fanning out to it
+        risk_hub.unsubscribe(ws)
+
+
+def _is_scalar_id(value) -> bool:
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+
+def _patient_ids(value) -> Optional[List[str]]:
+    """patient_ids from a client message as strings, or None if malformed."""
+    if not isinstance(value, list) or not all(_is_scalar_id(p) for p in value):
+        return None
+    return [str(p) for p in value]
+
+
+@app.get("/api/stream/stats")
+async def stream_stats():
+    """Fan-out counters for the real-time risk stream."""
+    return risk_hub.snapshot()
+
+
+@app.get("/api/audit")
+async def audit_records(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    patient_id: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+    limit: int = 100,
+):
+    """Audited predictions in a time range and/or for one patient, newest first."""
+    return await run_in_threadpool(
+        audit_log.query,
+        start.timestamp() if start else None,
+        end.timestamp() if end else None,
+        patient_id,
+        min(max(limit, 1), 1000),
+        tenant_id,
+    )
+
+
+@app.get("/api/audit/stats")
+async def audit_stats():
+    """Audit queue depth, drops and flush latency."""
+    return audit_log.stats()
+
+
+def _shap_store_call(fn, *args):
+    try:
+        return fn(*args)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+@app.get("/api/shap/{target}/importance")
+async def shap_importance(target: str):
+    """Global feature importance (mean |SHAP|) from the precomputed store."""
+    return _shap_store_call(shap_store.global_importance, target)
+
+
+@app.get("/api/shap/{target}/dependence/{feature}")
+async def shap_dependence(target: str, feature: str, max_points: int = 1000):
+    """Feature value vs SHAP value pairs for dependence plots."""
+    return _shap_store_call(shap_store.dependence, target, feature, max_points)
+
+
+@app.get("/api/shap/{target}/percentiles/{feature}")
+async def shap_percentiles(target: str, feature: str):
+    """Distribution of a feature's SHAP values across the dataset."""
+    return _shap_store_call(shap_store.feature_percentiles, target, feature)
+
+
+@app.get("/api/drift")
+async def drift(refresh: bool = False):
+    """Per-feature drift (PSI / binned KS) of live inputs vs. the training data."""
+    return drift_monitor.compute() if refresh else drift_monitor.report()
+
+
+@app.get("/api/deadline/stats")
+async def deadline_metrics():
+    """How often deadline-bound requests returned partial explanations."""
+    return {
+        **deadline_stats.snapshot(),
+        "shap_ms_per_row": engine.shap_cost.snapshot(),
+    }
+
+
+@app.get("/api/tenants")
+async def tenants():
+    """Tenant engine residency, switch latency and per-tenant memory."""
+    return engine_pool.stats()
+
+
+@app.get("/api/ready")
+async def ready():
+    """Readiness probe: 200 only after this worker has warmed up every model."""
+    body = {
+        "status": "ready" if engine.ready else "warming_up",
+        "pid": os.getpid(),
+        "warmup": engine.warmup_stats,
+        "first_request": first_request or None,
+    }
+    return JSONResponse(body, status_code=200 if engine.ready else 503)
 
 
 @app.get("/api/health")
 async def health():
     """Health check endpoint."""
-    return {"status": "ok", "models_loaded": engine._loaded}
+    return {
+        "status": "ok",
+        "models_loaded": engine._loaded,
+        "ready": engine.ready,
+        "model_version": engine.model_version,
+        "model_store": engine.store.stats() if engine.store is not None else None,
+    }
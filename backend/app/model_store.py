@@ -0,0 +1,200 @@
+"""
+MaternalGuard — Model Store
+Lazily loads per-target models and SHAP explainers on first use, tracks their
+footprint, and evicts least-recently-used explainers beyond a memory budget.
+The single-threaded explainer copies used by SHAP worker threads live here too,
+so they count toward the budget and go away with their engine.
+"""
+
+import os
+import copy
+import time
+import threading
+import numpy as np
+import shap
+import joblib
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, List
+
+# 0 disables the budget (everything stays resident once loaded)
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get("MATERNALGUARD_MODEL_BUDGET_MB", "0"))
+
+
+def _nbytes(obj: Any, depth: int = 2) -> int:
+    """Approximate footprint: NumPy arrays reachable through attributes/containers."""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if depth == 0:
+        return 0
+    if isinstance(obj, dict):
+        return sum(_nbytes(v, depth - 1) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(v, depth - 1) for v in obj)
+    if hasattr(obj, "__dict__"):
+        return sum(_nbytes(v, depth - 1) for v in vars(obj).values())
+    return 0
+
+
+def _model_nbytes(model) -> int:
+    try:
+        return len(model.get_booster().save_raw(raw_format="ubj"))
+    except AttributeError:
+        return _nbytes(model)
+
+
+def _explainer_nbytes(explainer) -> int:
+    return _nbytes(explainer.model, depth=3) + _nbytes(getattr(explainer, "data", None))
+
+
+def _single_threaded_explainer(model):
+    model = copy.deepcopy(model)
+    if hasattr(model, "get_booster"):
+        model.get_booster().set_param({"nthread": 1})
+    return shap.TreeExplainer(model)
+
+
+class _LazyView(Mapping):
+    """dict-like view so callers can keep using engine.models[target]."""
+
+    def __init__(self, store: "ModelStore", getter):
+        self._store = store
+        self._getter = getter
+
+    def __getitem__(self, target):
+        if target not in self._store.targets:
+            raise KeyError(target)
+        return self._getter(target)
+
+    def __iter__(self):
+        return iter(self._store.targets)
+
+    def __len__(self):
+        return len(self._store.targets)
+
+
+class ModelStore:
+    def __init__(self, model_dir: str, targets: List[str], budget_mb: float = MODEL_MEMORY_BUDGET_MB):
+        self.model_dir = model_dir
+        self.targets = list(targets)
+        self.budget_bytes = int(budget_mb * 1024 * 1024) if budget_mb > 0 else None
+        self._models: Dict[str, Any] = {}
+        self._model_bytes: Dict[str, int] = {}
+        self._explainers: "OrderedDict[str, Any]" = OrderedDict()  # LRU order, oldest first
+        self._explainer_bytes: Dict[str, int] = {}
+        # (target, worker slot) -> single-threaded copy for that SHAP worker, LRU order
+        self._worker_explainers: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._worker_explainer_bytes: Dict[tuple, int] = {}
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self.stats_counters = {
+            "model_loads": 0,
+            "explainer_builds": 0,
+            "explainer_hits": 0,
+            "explainer_evictions": 0,
+            "worker_explainer_builds": 0,
+            "worker_explainer_evictions": 0,
+        }
+        self.models = _LazyView(self, self.model)
+        self.explainers = _LazyView(self, self.explainer)
+
+    @property
+    def resident_bytes(self) -> int:
+        return (
+            sum(self._model_bytes.values())
+            + sum(self._explainer_bytes.values())
+            + sum(self._worker_explainer_bytes.values())
+        )
+
+    def model(self, target: str):
+        model = self._models.get(target)
+        if model is not None:
+            return model
+        with self._lock:
+            if target not in self._models:
+                model = joblib.load(os.path.join(self.model_dir, f"{target}_model.joblib"))
+                self._models[target] = model
+                self._model_bytes[target] = _model_nbytes(model)
+                self.stats_counters["model_loads"] += 1
+                self._enforce_budget(keep=target)
+            return self._models[target]
+
+    def explainer(self, target: str):
+        with self._lock:
+            explainer = self._explainers.get(target)
+            if explainer is not None:
+                self._explainers.move_to_end(target)
+                self.stats_counters["explainer_hits"] += 1
+            else:
+                explainer = shap.TreeExplainer(self.model(target))
+                self._explainers[target] = explainer
+                self._explainer_bytes[target] = _explainer_nbytes(explainer)
+                self.stats_counters["explainer_builds"] += 1
+                self._enforce_budget(keep=target)
+            self._last_used[target] = time.time()
+            return explainer
+
+    def worker_explainer(self, target: str, slot: int):
+        """Single-threaded explainer copy for one SHAP worker thread."""
+        key = (target, slot)
+        with self._lock:
+            explainer = self._worker_explainers.get(key)
+            if explainer is not None:
+                self._worker_explainers.move_to_end(key)
+                return explainer
+            model = self.model(target)
+
+        # Only this worker builds this key, so the copy can be made outside the lock
+        explainer = _single_threaded_explainer(model)
+        with self._lock:
+            self._worker_explainers[key] = explainer
+            self._worker_explainer_bytes[key] = _explainer_nbytes(explainer)
+            self.stats_counters["worker_explainer_builds"] += 1
+            self._enforce_budget(keep=key)
+        return explainer
+
+    def _enforce_budget(self, keep):
+        """Evict LRU worker copies, then LRU explainers (never `keep`), until under budget."""
+        if self.budget_bytes is None:
+            return
+        for key in list(self._worker_explainers):
+            if self.resident_bytes <= self.budget_bytes:
+                return
+            if key == keep:
+                continue
+            del self._worker_explainers[key]
+            del self._worker_explainer_bytes[key]
+            self.stats_counters["worker_explainer_evictions"] += 1
+        for target in list(self._explainers):
+            if self.resident_bytes <= self.budget_bytes:
+                break
+            if target == keep:
+                continue
+            del self._explainers[target]
+            del self._explainer_bytes[target]
+            self.stats_counters["explainer_evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        mb = 1024 * 1024
+        with self._lock:
+            return {
+                "budget_mb": round(self.budget_bytes / mb, 2) if self.budget_bytes else None,
+                "resident_mb": round(self.resident_bytes / mb, 3),
+                "over_budget": self.budget_bytes is not None and self.resident_bytes > self.budget_bytes,
+                "explainer_lru": list(self._explainers),  # least recently used first
+                "worker_explainers": len(self._worker_explainers),
+                "targets": {
+                    target: {
+                        "model_loaded": target in self._models,
+                        "model_mb": round(self._model_bytes.get(target, 0) / mb, 3),
+                        "explainer_resident": target in self._explainers,
+                        "explainer_mb": round(self._explainer_bytes.get(target, 0) / mb, 3),
+                        "worker_explainer_mb": round(
+                            sum(b for (t, _), b in self._worker_explainer_bytes.items() if t == target) / mb, 3
+                        ),
+                        "last_used": self._last_used.get(target),
+                    }
+                    for target in self.targets
+                },
+                **self.stats_counters,
+            }
@@ -3,12 +3,18 @@ MaternalGuard — Prediction Engine
 Loads trained XGBoost models, runs inference, and generates SHAP explanations.
 """
 
+import io
 import os
+import time
+import hashlib
 import numpy as np
 import pandas as pd
-import shap
 import joblib
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+
+from app.model_store import ModelStore
+from app.explain_pool import shap_executor, PARALLEL_MIN_ROWS
+from app.deadline import deadline_stats, ShapCostModel
 
 MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "ml", "saved_models")
 
@@ -366,6 +372,13 @@ RECOMMENDATIONS = {
 }
 
 
+# Batch sizes run through each model/explainer by PredictionEngine.warm_up
+WARMUP_BATCH_SIZES = [1, 32]
+
+RISK_LEVELS = ["low", "moderate", "high", "critical"]
+RISK_THRESHOLDS = [0.2, 0.5, 0.8]
+
+
 def categorize_risk(score: float) -> str:
     if score < 0.2:
         return "low"
@@ -377,57 +390,167 @@ def categorize_risk(score: float) -> str:
         return "critical"
 
 
+def categorize_risk_batch(scores: np.ndarray) -> np.ndarray:
+    """Vectorized categorize_risk: returns indices into RISK_LEVELS."""
+    return np.searchsorted(RISK_THRESHOLDS, scores, side="right")
+
+
+# Artifacts shared across engines with identical files (keyed by content hash),
+# so tenants with the same encoders/feature order hold a single copy.
+_shared_artifacts: Dict[str, Any] = {}
+
+
+def _load_shared(path: str) -> Any:
+    with open(path, "rb") as f:
+        data = f.read()
+    key = hashlib.sha256(data).hexdigest()
+    if key not in _shared_artifacts:
+        _shared_artifacts[key] = joblib.load(io.BytesIO(data))
+    return _shared_artifacts[key]
+
+
 class PredictionEngine:
-    def __init__(self):
+    def __init__(self, model_dir: str = MODEL_DIR):
+        self.model_dir = os.path.normpath(model_dir)
         self.models = {}
         self.explainers = {}
         self.label_encoders = {}
         self.feature_names = []
+        self.model_version = None
+        self.store = None
+        # Callables invoked with each encoded batch served by predict/predict_encoded
+        self.input_observers = []
+        # SHAP cost per target and batch size (drives deadline scheduling)
+        self.shap_cost = ShapCostModel()
+        # Set once warm_up() has exercised every model and explainer
+        self.ready = False
+        self.warmup_stats: Optional[Dict[str, Any]] = None
         self._loaded = False
 
     def load_models(self):
-        """Load all saved models and create SHAP explainers."""
-        model_dir = os.path.normpath(MODEL_DIR)
+        """Load encoders and feature names; models and SHAP explainers load lazily per target."""
+        model_dir = self.model_dir
+        self.ready = False
 
-        # Load label encoders and feature names
-        self.label_encoders = joblib.load(os.path.join(model_dir, "label_encoders.joblib"))
-        self.feature_names = joblib.load(os.path.join(model_dir, "feature_names.joblib"))
+        # Load label encoders and feature names (deduplicated across engines)
+        self.label_encoders = _load_shared(os.path.join(model_dir, "label_encoders.joblib"))
+        self.feature_names = _load_shared(os.path.join(model_dir, "feature_names.joblib"))
 
-        # Load each model and create explainer
+        # Short content hash identifying this model set (changes on retrain)
+        digest = hashlib.sha256()
         for target in TARGETS:
-            model_path = os.path.join(model_dir, f"{target}_model.joblib")
-            model = joblib.load(model_path)
-            self.models[target] = model
-            self.explainers[target] = shap.TreeExplainer(model)
+            with open(os.path.join(model_dir, f"{target}_model.joblib"), "rb") as f:
+                digest.update(f.read())
+        self.model_version = digest.hexdigest()[:12]
+
+        # Models and explainers are materialized on first access through the store
+        self.store = ModelStore(model_dir, TARGETS)
+        self.models = self.store.models
+        self.explainers = self.store.explainers
 
         self._loaded = True
-        print(f"✓ Loaded {len(self.models)} models with SHAP explainers")
+        print(f"✓ Registered {len(TARGETS)} models (lazy loading, model version {self.model_version})")
+
+    def warm_up(self, batch_sizes: List[int] = WARMUP_BATCH_SIZES) -> Dict[str, Any]:
+        """Run representative batches through every model and explainer.
+
+        Materializes lazily loaded models/explainers and XGBoost's first-call
+        setup so the first real request runs at steady-state latency. Bypasses
+        input observers, so warm-up rows never reach drift monitoring.
+        """
+        if not self._loaded:
+            self.load_models()
+        started = time.perf_counter()
+
+        csv_path = os.path.join(self.model_dir, "synthetic_patients.csv")
+        if not os.path.exists(csv_path):
+            csv_path = os.path.join(MODEL_DIR, "synthetic_patients.csv")
+        # Large batches take the parallel SHAP executor: warm it with a batch that
+        # gives every worker a chunk, after building each worker's explainer copies
+        parallel_rows = 0
+        if shap_executor.max_workers > 1:
+            parallel_rows = max(PARALLEL_MIN_ROWS, shap_executor.chunk_size * shap_executor.max_workers)
+        n_rows = max(max(batch_sizes), parallel_rows)
+        if os.path.exists(csv_path):
+            sample = pd.read_csv(csv_path, nrows=n_rows)
+        else:
+            sample = pd.DataFrame([{}] * n_rows)
+        X_all = self._prepare_batch(sample)
+
+        target_ms = {}
+        for target in TARGETS:
+            target_started = time.perf_counter()
+            model, explainer = self.models[target], self.explainers[target]
+            for size in batch_sizes:
+                X = X_all.iloc[:size]
+                model.predict_proba(X)
+                explainer.shap_values(X)
+                # Seed the deadline scheduler's cost estimate with a warm measurement per size
+                self._explain_target(target, X)
+            if parallel_rows:
+                for slot in range(shap_executor.max_workers):
+                    self.store.worker_explainer(target, slot)
+                self._explain_target(target, X_all.iloc[:parallel_rows])
+            target_ms[target] = round((time.perf_counter() - target_started) * 1000, 1)
+
+        # Single-patient path end to end: input encoding and response assembly
+        raw = sample.iloc[0].to_dict()
+        X = self._prepare_input(raw)
+        self._build_result(
+            {t: float(self.models[t].predict_proba(X)[0, 1]) for t in TARGETS},
+            {t: self.explainers[t].shap_values(X)[0] for t in TARGETS},
+            raw,
+        )
+
+        self.warmup_stats = {
+            "warmup_ms": round((time.perf_counter() - started) * 1000, 1),
+            "batch_sizes": list(batch_sizes),
+            "parallel_rows": parallel_rows or None,
+            "targets_ms": target_ms,
+            "completed_at": time.time(),
+        }
+        self.ready = True
+        print(f"✓ Warmed up {len(TARGETS)} models in {self.warmup_stats['warmup_ms']:.0f} ms")
+        return self.warmup_stats
 
     def _prepare_input(self, patient_data: Dict[str, Any]) -> pd.DataFrame:
         """Convert patient JSON to model-ready DataFrame."""
-        df = pd.DataFrame([patient_data])
+        return self._prepare_batch(pd.DataFrame([patient_data]))
 
-        # Ensure all expected features exist
-        for col in self.feature_names:
-            if col not in df.columns:
-                df[col] = 0
+    def _prepare_batch(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Encode many patient rows at once (same encoding as _prepare_input)."""
+        # Ensure all expected features exist, reordered to match training
+        df = df.reindex(columns=self.feature_names, fill_value=0)
 
-        # Encode categoricals  
+        # Encode categoricals (LabelEncoder classes are sorted, so category
+        # codes equal le.transform codes)
         for col in CATEGORICAL_FEATURES:
-            if col in df.columns and col in self.label_encoders:
+            if col in self.label_encoders:
                 le = self.label_encoders[col]
-                val = str(df[col].iloc[0])
-                if val in le.classes_:
-                    df[col] = le.transform([val])[0]
-                else:
-                    df[col] = 0  # Default for unseen categories
-
-        # Reorder columns to match training
-        df = df[self.feature_names]
+                codes = pd.Categorical(df[col].astype(str), categories=le.classes_).codes
+                df[col] = np.where(codes < 0, 0, codes)  # Default for unseen categories
+
         return df
 
-    def predict(self, patient_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Run prediction for all 5 conditions and return SHAP explanations."""
+    def predict_proba_batch(self, X: pd.DataFrame, observe: bool = False) -> np.ndarray:
+        """Positive-class probabilities for encoded rows, shape (len(TARGETS), n).
+
+        observe=True passes the rows to input_observers; set it for live
+        traffic only, not for offline cohorts or synthetic candidates.
+        """
+        if not self._loaded:
+            self.load_models()
+        if observe:
+            for observer in self.input_observers:
+                observer(X)
+        return np.vstack([self.models[t].predict_proba(X)[:, 1] for t in TARGETS])
+
+    def predict(self, patient_data: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Run prediction for all 5 conditions and return SHAP explanations.
+
+        With a deadline (a time.perf_counter() value), explanations that would
+        not finish in time are skipped and the response is flagged as partial.
+        """
         if not self._loaded:
             self.load_models()
 
@@ -437,27 +560,111 @@ class PredictionEngine:
         # Prepare encoded input
         X = self._prepare_input(patient_data)
 
-        results = []
-        all_shap_values = []
+        return self.predict_encoded(X, [raw_values], deadline)[0]
 
-        for target in TARGETS:
-            model = self.models[target]
-            explainer = self.explainers[target]
+    def predict_encoded(
+        self,
+        X: pd.DataFrame,
+        raw_rows: Optional[List[Dict[str, Any]]] = None,
+        deadline: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Predict and explain already-encoded rows (one model/SHAP call per target).
 
-            # Get probability
-            prob = float(model.predict_proba(X)[:, 1][0])
-            risk_category = categorize_risk(prob)
+        raw_rows holds the original values shown in top factors; when omitted,
+        encoded values are shown with categoricals decoded back to labels.
+        """
+        if not self._loaded:
+            self.load_models()
 
-            # Get SHAP values
+        for observe in self.input_observers:
+            observe(X)
+
+        # Get probabilities
+        probs = {target: self.models[target].predict_proba(X)[:, 1] for target in TARGETS}
+
+        # Get SHAP values (large batches are chunked across the SHAP worker pool)
+        if deadline is not None:
+            shap_matrices = self._explain_until(X, probs, deadline)
+        elif len(X) >= PARALLEL_MIN_ROWS and shap_executor.max_workers > 1:
+            shap_all = shap_executor.explain(self, X, TARGETS)
+            shap_matrices = {target: shap_all[t] for t, target in enumerate(TARGETS)}
+        else:
+            shap_matrices = {target: self._explain_target(target, X) for target in TARGETS}
+
+        encoded = X.to_numpy()
+        results = [
+            self._build_result(
+                {t: float(probs[t][row]) for t in TARGETS},
+                {t: shap_matrices[t][row] if shap_matrices[t] is not None else None for t in TARGETS},
+                raw_rows[row] if raw_rows is not None else self._decode_row(encoded[row]),
+            )
+            for row in range(len(X))
+        ]
+
+        if deadline is not None:
+            skipped = [t for t in TARGETS if shap_matrices[t] is None]
+            deadline_stats.record(TARGETS, skipped, missed=time.perf_counter() > deadline)
+            for result in results:
+                result["explanations_partial"] = bool(skipped)
+                for condition in result["conditions"]:
+                    condition["explanation_status"] = (
+                        "skipped" if condition["condition_key"] in skipped else "complete"
+                    )
+        return results
+
+    def _explain_target(self, target: str, X: pd.DataFrame) -> np.ndarray:
+        """SHAP matrix for one target, updating its cost estimate."""
+        explainer = self.explainers[target]  # lazy build is not part of the estimate
+        started = time.perf_counter()
+        if len(X) >= PARALLEL_MIN_ROWS and shap_executor.max_workers > 1:
+            shap_values = shap_executor.explain(self, X, [target])[0]
+        else:
             shap_values = explainer.shap_values(X)
             if isinstance(shap_values, list):
-                sv = shap_values[1][0]  # class 1 (positive)
-            else:
-                sv = shap_values[0]
+                shap_values = shap_values[1]  # class 1 (positive)
+        self.shap_cost.observe(target, len(X), time.perf_counter() - started)
+        return shap_values
+
+    def _explain_until(
+        self, X: pd.DataFrame, probs: Dict[str, np.ndarray], deadline: float
+    ) -> Dict[str, Optional[np.ndarray]]:
+        """Explain targets highest-risk first, skipping any whose estimated cost would overrun."""
+        shap_matrices: Dict[str, Optional[np.ndarray]] = {target: None for target in TARGETS}
+        for target in sorted(TARGETS, key=lambda t: -float(probs[t].max())):
+            if time.perf_counter() + self.shap_cost.estimate(target, len(X)) > deadline:
+                self.shap_cost.skipped(target, len(X))
+                continue
+            shap_matrices[target] = self._explain_target(target, X)
+        return shap_matrices
+
+    def _decode_row(self, values: np.ndarray) -> Dict[str, Any]:
+        """Display values for an encoded row (categorical codes → labels)."""
+        row = dict(zip(self.feature_names, values.tolist()))
+        for col in CATEGORICAL_FEATURES:
+            if col in row and col in self.label_encoders:
+                classes = self.label_encoders[col].classes_
+                code = int(row[col])
+                row[col] = str(classes[code]) if 0 <= code < len(classes) else row[col]
+        return row
+
+    def _build_result(
+        self,
+        probs: Dict[str, float],
+        shap_rows: Dict[str, Optional[np.ndarray]],
+        raw_values: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Assemble the response for one patient from per-target scores and SHAP rows."""
+        results = []
+        all_shap_values = []
+
+        for target in TARGETS:
+            prob = probs[target]
+            risk_category = categorize_risk(prob)
+            sv = shap_rows[target]
 
-            # Build top factors (sorted by absolute SHAP value)
+            # Build top factors (sorted by absolute SHAP value); none if skipped
             feature_impacts = []
-            for i, fname in enumerate(self.feature_names):
+            for i, fname in enumerate(self.feature_names if sv is not None else []):
                 shap_val = float(sv[i])
                 if abs(shap_val) < 0.001:
                     continue
@@ -467,7 +674,7 @@ class PredictionEngine:
                     "context", f"This feature contributes to the risk prediction."
                 )
 
-                feat_val = raw_values.get(fname, X[fname].iloc[0])
+                feat_val = raw_values.get(fname, 0)
 
                 feature_impacts.append({
                     "feature": display_name,
@@ -0,0 +1,266 @@
+"""
+MaternalGuard — Global SHAP Store
+Offline job that precomputes SHAP values for a dataset across all models,
+plus a memory-mapped reader that serves global importance and dependence data.
+
+Build the store with:  python -m app.shap_store
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+from app.prediction import (
+    engine,
+    MODEL_DIR,
+    TARGETS,
+    CONDITION_NAMES,
+    FEATURE_EXPLANATIONS,
+)
+from app.explain_pool import ExplanationExecutor, SHAP_WORKERS
+
+DATASET_PATH = os.path.join(MODEL_DIR, "synthetic_patients.csv")
+SHAP_STORE_DIR = os.path.join(MODEL_DIR, "shap_store")
+
+PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+CHUNK_SIZE = 1000
+# Max |base value + Σ SHAP − model margin| accepted for a stored row (float32 values)
+SHAP_ADDITIVITY_TOLERANCE = 1e-3
+BUILD_DIR_PATTERN = re.compile(r"^build-\d+$")
+# Builds kept on disk (the current one plus older ones readers may still map)
+KEEP_BUILDS = 2
+
+
+def build_shap_store(
+    dataset_path: str = DATASET_PATH,
+    store_dir: str = SHAP_STORE_DIR,
+    chunk_size: int = CHUNK_SIZE,
+    n_workers: int = SHAP_WORKERS,
+) -> Dict[str, Any]:
+    """Compute SHAP values for every row and target into a memory-mappable store.
+
+    Each build goes into its own directory store_dir/build-<seq>/:
+      shap_values.npy   float32 (len(TARGETS), n_rows, n_features)
+      features.npy      float32 (n_rows, n_features), encoded inputs
+      summary.npz       mean |SHAP| importance and per-feature SHAP percentiles
+    store_dir/meta.json (model version, row count, feature order, build dir) is
+    swapped in last with os.replace, so running readers keep their mapped
+    files intact and only switch once the new build is complete.
+    """
+    if not engine._loaded:
+        engine.load_models()
+
+    started = time.time()
+    df = pd.read_csv(dataset_path)
+    X_frame = engine._prepare_batch(df)
+    X = X_frame.to_numpy(dtype=np.float32)
+    n_rows, n_features = X.shape
+
+    build_dir = _new_build_dir(store_dir)
+    build_id = os.path.basename(build_dir)
+
+    # Pool workers write their chunks straight into the memory-mapped output
+    values_path = os.path.join(build_dir, "shap_values.npy")
+    values = np.lib.format.open_memmap(
+        values_path, mode="w+", dtype=np.float32, shape=(len(TARGETS), n_rows, n_features)
+    )
+    executor = ExplanationExecutor(max_workers=n_workers, chunk_size=chunk_size)
+    try:
+        executor.explain(engine, X_frame, TARGETS, out=values)
+    finally:
+        executor.shutdown()
+    values.flush()
+    del values
+
+    np.save(os.path.join(build_dir, "features.npy"), X)
+
+    # Per-target reductions, one target at a time to bound memory
+    values = np.load(values_path, mmap_mode="r")
+    importance = np.zeros((len(TARGETS), n_features), dtype=np.float32)
+    percentiles = np.zeros((len(TARGETS), n_features, len(PERCENTILES)), dtype=np.float32)
+    for t in range(len(TARGETS)):
+        sv = np.asarray(values[t])
+        importance[t] = np.abs(sv).mean(axis=0)
+        percentiles[t] = np.percentile(sv, PERCENTILES, axis=0).T
+    expected_values = np.array(
+        [_expected_value(target, X_frame.iloc[:1], values[t, 0]) for t, target in enumerate(TARGETS)]
+    )
+    del values
+    np.savez(
+        os.path.join(build_dir, "summary.npz"),
+        importance=importance,
+        percentiles=percentiles,
+        expected_values=expected_values,
+    )
+
+    meta = {
+        "model_version": engine.model_version,
+        "build": build_id,
+        "rows": n_rows,
+        "targets": TARGETS,
+        "feature_names": list(engine.feature_names),
+        "percentiles": PERCENTILES,
+        "source": os.path.basename(dataset_path),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "build_seconds": round(time.time() - started, 1),
+    }
+    meta_path = os.path.join(store_dir, "meta.json")
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    # Unlinking is safe for readers still mapping an old build (POSIX keeps the inode)
+    for old in _builds(store_dir)[:-KEEP_BUILDS]:
+        if old != build_id:
+            shutil.rmtree(os.path.join(store_dir, old), ignore_errors=True)
+
+    print(f"✓ Stored SHAP values for {n_rows} rows x {len(TARGETS)} targets → {store_dir}")
+    return meta
+
+
+def _builds(store_dir: str) -> List[str]:
+    """Build directory names, oldest first."""
+    names = [d for d in os.listdir(store_dir) if BUILD_DIR_PATTERN.match(d)]
+    return sorted(names, key=lambda d: int(d.split("-")[1]))
+
+
+def _new_build_dir(store_dir: str) -> str:
+    """Create store_dir/build-<seq>/ with seq one past the newest existing build."""
+    os.makedirs(store_dir, exist_ok=True)
+    while True:
+        builds = _builds(store_dir)
+        seq = int(builds[-1].split("-")[1]) + 1 if builds else 1
+        build_dir = os.path.join(store_dir, f"build-{seq:06d}")
+        try:
+            os.mkdir(build_dir)
+            return build_dir
+        except FileExistsError:
+            continue  # a concurrent build took this sequence number
+
+
+def _expected_value(target: str, X_row: pd.DataFrame, stored_row: np.ndarray) -> float:
+    """Base value for a target, checked so base + Σ SHAP reproduces the model margin.
+
+    TreeExplainer only fills in expected_value on its first shap_values call,
+    so explain one row before reading it.
+    """
+    explainer = engine.explainers[target]
+    explainer.shap_values(X_row)
+    base = float(np.ravel(explainer.expected_value)[-1])
+    margin = float(engine.models[target].predict(X_row, output_margin=True)[0])
+    reconstructed = base + float(stored_row.astype(np.float64).sum())
+    if abs(reconstructed - margin) > SHAP_ADDITIVITY_TOLERANCE:
+        raise RuntimeError(
+            f"SHAP store for {target} is inconsistent: base {base:.6f} + stored SHAP sum "
+            f"= {reconstructed:.6f}, model margin = {margin:.6f}"
+        )
+    return base
+
+
+class ShapStore:
+    """Read-only view over a built SHAP store; arrays are memory-mapped, not loaded."""
+
+    def __init__(self, store_dir: str = SHAP_STORE_DIR):
+        self.store_dir = store_dir
+        self._meta: Optional[Dict[str, Any]] = None
+        self._mtime = None
+
+    def _load(self):
+        meta_path = os.path.join(self.store_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError("SHAP store has not been built (run: python -m app.shap_store)")
+
+        mtime = os.path.getmtime(meta_path)
+        if self._meta is not None and mtime == self._mtime:
+            return
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self._mtime = mtime
+        if self._meta is not None and meta.get("build") == self._meta.get("build"):
+            return
+
+        # Open the new build fully before switching to it
+        build_dir = os.path.join(self.store_dir, meta.get("build", ""))
+        values = np.load(os.path.join(build_dir, "shap_values.npy"), mmap_mode="r")
+        features = np.load(os.path.join(build_dir, "features.npy"), mmap_mode="r")
+        with np.load(os.path.join(build_dir, "summary.npz")) as summary:
+            importance = summary["importance"]
+            percentiles = summary["percentiles"]
+            expected_values = summary["expected_values"]
+
+        self.values, self.features = values, features
+        self.importance, self.percentiles, self.expected_values = importance, percentiles, expected_values
+        self._build_dir = build_dir
+        self._feature_index = {f: i for i, f in enumerate(meta["feature_names"])}
+        self._meta = meta
+
+    def _locate(self, target: str, feature: Optional[str] = None):
+        self._load()
+        if target not in TARGETS:
+            raise KeyError(f"Unknown target: {target}")
+        if feature is None:
+            return TARGETS.index(target), None
+        if feature not in self._feature_index:
+            raise KeyError(f"Unknown feature: {feature}")
+        return TARGETS.index(target), self._feature_index[feature]
+
+    def _header(self, target: str) -> Dict[str, Any]:
+        return {
+            "condition": CONDITION_NAMES[target],
+            "condition_key": target,
+            "model_version": self._meta["model_version"],
+            "stale": engine.model_version is not None and self._meta["model_version"] != engine.model_version,
+            "rows": self._meta["rows"],
+        }
+
+    def global_importance(self, target: str) -> Dict[str, Any]:
+        t, _ = self._locate(target)
+        order = np.argsort(-self.importance[t])
+        features = []
+        for j in order:
+            fname = self._meta["feature_names"][j]
+            features.append({
+                "feature": FEATURE_EXPLANATIONS.get(fname, {}).get("display", fname),
+                "feature_key": fname,
+                "mean_abs_shap": round(float(self.importance[t, j]), 6),
+            })
+        return {
+            **self._header(target),
+            "expected_value": round(float(self.expected_values[t]), 6),
+            "features": features,
+        }
+
+    def dependence(self, target: str, feature: str, max_points: int = 1000) -> Dict[str, Any]:
+        """Feature value vs SHAP value, evenly strided to at most max_points rows."""
+        t, j = self._locate(target, feature)
+        step = max(1, -(-self._meta["rows"] // max(max_points, 1)))
+        return {
+            **self._header(target),
+            "feature_key": feature,
+            "feature_values": self.features[::step, j].astype(float).round(4).tolist(),
+            "shap_values": self.values[t, ::step, j].astype(float).round(5).tolist(),
+        }
+
+    def feature_percentiles(self, target: str, feature: str) -> Dict[str, Any]:
+        t, j = self._locate(target, feature)
+        return {
+            **self._header(target),
+            "feature_key": feature,
+            "percentiles": {
+                str(p): round(float(v), 6) for p, v in zip(self._meta["percentiles"], self.percentiles[t, j])
+            },
+        }
+
+
+# Singleton reader
+shap_store = ShapStore()
+
+
+if __name__ == "__main__":
+    build_shap_store()
@@ -0,0 +1,231 @@
+"""
+MaternalGuard — Similar-Patient Retrieval
+Nearest-neighbor index over standardized, encoded feature vectors of historical patients.
+
+Benchmark query latency vs. index size with:  python -m app.similarity
+"""
+
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from typing import Any, Dict, Optional
+
+from app.prediction import engine, MODEL_DIR, TARGETS, CONDITION_NAMES
+
+DATASET_PATH = os.path.join(MODEL_DIR, "synthetic_patients.csv")
+
+# Above this many rows "auto" mode switches from exact to partitioned search
+APPROX_MIN_ROWS = 200_000
+KMEANS_SAMPLE_SIZE = 50_000
+DEFAULT_N_PROBE = 8
+ASSIGN_CHUNK_SIZE = 65_536
+
+
+def _sq_distances(vectors: np.ndarray, norms: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Squared Euclidean distances from q to every row, via ||v||² - 2v·q + ||q||²."""
+    return norms - 2.0 * (vectors @ q) + float(q @ q)
+
+
+def _top_k(d: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(d))
+    if k < 1:
+        return np.empty(0, dtype=np.intp)
+    idx = np.argpartition(d, k - 1)[:k]
+    return idx[np.argsort(d[idx])]
+
+
+class SimilarityIndex:
+    """Exact brute-force search plus an IVF-style partitioned mode for large datasets."""
+
+    def __init__(self, n_probe: int = DEFAULT_N_PROBE):
+        self.n_probe = n_probe
+        self.vectors = None
+        self.model_version = None
+        # Index built by build(), for the engine's model version at the time
+        self._built: Optional["SimilarityIndex"] = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return 0 if self.vectors is None else len(self.vectors)
+
+    def fit(self, X: np.ndarray, outcomes: np.ndarray, partitioned: Optional[bool] = None):
+        """Index encoded rows X (n, n_features) with their outcomes (n, len(TARGETS))."""
+        X = np.asarray(X, dtype=np.float32)
+        self.mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        self.scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+
+        self.vectors = np.ascontiguousarray((X - self.mean) / self.scale, dtype=np.float32)
+        self.norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        self.outcomes = np.asarray(outcomes, dtype=np.int8)
+        self.row_ids = np.arange(len(X))
+
+        self.centroids = None
+        if partitioned if partitioned is not None else len(X) >= APPROX_MIN_ROWS:
+            self._build_partitions()
+        return self
+
+    def _build_partitions(self):
+        n = len(self.vectors)
+        n_partitions = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(42)
+        sample = self.vectors[rng.choice(n, size=min(n, KMEANS_SAMPLE_SIZE), replace=False)]
+        kmeans = MiniBatchKMeans(n_clusters=n_partitions, n_init=1, random_state=42).fit(sample)
+        centroids = kmeans.cluster_centers_.astype(np.float32)
+        centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+
+        labels = np.empty(n, dtype=np.int32)
+        for start in range(0, n, ASSIGN_CHUNK_SIZE):
+            block = self.vectors[start:start + ASSIGN_CHUNK_SIZE]
+            d = centroid_norms[None, :] - 2.0 * (block @ centroids.T)
+            labels[start:start + len(block)] = np.argmin(d, axis=1)
+
+        # Store rows grouped by partition so each partition is one contiguous slice
+        order = np.argsort(labels, kind="stable")
+        self.vectors = self.vectors[order]
+        self.norms = self.norms[order]
+        self.outcomes = self.outcomes[order]
+        self.row_ids = self.row_ids[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_partitions))])
+        self.centroids = centroids
+        self.centroid_norms = centroid_norms
+
+    def build(self, dataset_path: str = DATASET_PATH) -> "SimilarityIndex":
+        """Index the historical dataset using the engine's encoding.
+
+        Fits a fresh index and swaps it in whole, so queries running against
+        the previous one are never mixed with half-rebuilt state.
+        """
+        if not engine._loaded:
+            engine.load_models()
+        df = pd.read_csv(dataset_path)
+        X = engine._prepare_batch(df).to_numpy(dtype=np.float32)
+        index = SimilarityIndex(self.n_probe).fit(X, df[TARGETS].to_numpy())
+        index.model_version = engine.model_version
+        self._built = index
+        print(f"✓ Built similarity index over {len(X)} patients (model version {index.model_version})")
+        return index
+
+    def _ensure_built(self) -> "SimilarityIndex":
+        """The built index, rebuilt when the engine's models changed since it was built."""
+        index = self._built
+        if index is None or index.model_version != engine.model_version:
+            with self._lock:
+                index = self._built
+                if index is None or index.model_version != engine.model_version:
+                    index = self.build()
+        return index
+
+    def search(self, x: np.ndarray, k: int = 5, mode: str = "auto"):
+        """Return (row_ids, distances, positions) of the k nearest rows to encoded vector x.
+
+        positions index this index's internal row order (e.g. into self.outcomes).
+        """
+        q = ((np.asarray(x, dtype=np.float32).ravel() - self.mean) / self.scale).astype(np.float32)
+
+        if mode == "auto":
+            mode = "approx" if self.centroids is not None else "exact"
+        if mode == "approx" and self.centroids is None:
+            raise ValueError("Index was built without partitions; use mode='exact'")
+
+        if mode == "exact":
+            d = _sq_distances(self.vectors, self.norms, q)
+            idx = _top_k(d, k)
+            return self.row_ids[idx], np.sqrt(np.maximum(d[idx], 0)), idx
+
+        cd = self.centroid_norms - 2.0 * (self.centroids @ q)
+        probe = _top_k(cd, self.n_probe)
+        candidates = np.concatenate([
+            np.arange(self.offsets[p], self.offsets[p + 1]) for p in probe
+        ])
+        d = _sq_distances(self.vectors[candidates], self.norms[candidates], q)
+        local = _top_k(d, k)
+        idx = candidates[local]
+        return self.row_ids[idx], np.sqrt(np.maximum(d[local], 0)), idx
+
+    def similar_patients(self, patient_data: Dict[str, Any], k: int = 5, mode: str = "auto") -> Dict[str, Any]:
+        index = self._ensure_built()
+        X = engine._prepare_input(patient_data).to_numpy(dtype=np.float32)
+
+        started = time.perf_counter()
+        row_ids, distances, idx = index.search(X[0], k=k, mode=mode)
+        query_ms = (time.perf_counter() - started) * 1000
+
+        outcomes = index.outcomes[idx]
+        neighbors = []
+        for row, dist, outcome in zip(row_ids, distances, outcomes):
+            neighbors.append({
+                "row": int(row),
+                "distance": round(float(dist), 4),
+                "outcomes": {target: int(o) for target, o in zip(TARGETS, outcome)},
+            })
+
+        return {
+            "k": len(neighbors),
+            "mode": mode if mode != "auto" else ("approx" if index.centroids is not None else "exact"),
+            "index_size": index.size,
+            "query_ms": round(query_ms, 3),
+            "neighbors": neighbors,
+            "outcome_rates": [
+                {
+                    "condition": CONDITION_NAMES[target],
+                    "condition_key": target,
+                    "rate": round(float(outcomes[:, t].mean()), 4) if len(outcomes) else 0.0,
+                }
+                for t, target in enumerate(TARGETS)
+            ],
+        }
+
+
+def benchmark(sizes=(10_000, 100_000, 1_000_000), k: int = 10, n_queries: int = 200):
+    """Time exact vs. partitioned queries as the index grows.
+
+    Larger indexes are synthesized by resampling the real dataset and adding
+    small per-feature jitter, so vectors keep a realistic distribution.
+    """
+    if not engine._loaded:
+        engine.load_models()
+    df = pd.read_csv(DATASET_PATH)
+    base = engine._prepare_batch(df).to_numpy(dtype=np.float32)
+    base_outcomes = df[TARGETS].to_numpy()
+    jitter = 0.05 * base.std(axis=0)
+    rng = np.random.default_rng(0)
+
+    print(f"{'rows':>10} {'mode':>7} {'build s':>8} {'p50 ms':>8} {'p99 ms':>8} {'recall':>7}")
+    for n in sizes:
+        pick = rng.integers(0, len(base), size=n)
+        X = base[pick] + rng.normal(size=(n, base.shape[1])).astype(np.float32) * jitter
+        queries = base[rng.integers(0, len(base), size=n_queries)]
+
+        exact_hits = None
+        for mode in ("exact", "approx"):
+            started = time.perf_counter()
+            index = SimilarityIndex().fit(X, base_outcomes[pick], partitioned=(mode == "approx"))
+            build_s = time.perf_counter() - started
+
+            latencies, hits = [], []
+            for q in queries:
+                t0 = time.perf_counter()
+                row_ids, _, _ = index.search(q, k=k, mode=mode)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                hits.append(set(row_ids.tolist()))
+
+            if mode == "exact":
+                exact_hits = hits
+                recall = 1.0
+            else:
+                recall = np.mean([len(a & e) / k for a, e in zip(hits, exact_hits)])
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"{n:>10} {mode:>7} {build_s:>8.2f} {p50:>8.2f} {p99:>8.2f} {recall:>7.3f}")
+
+
+# Singleton index (built lazily on first query)
+similarity_index = SimilarityIndex()
+
+
+if __name__ == "__main__":
+    benchmark()
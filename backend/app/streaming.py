@@ -0,0 +1,208 @@
+"""
+MaternalGuard — Streaming Risk Updates
+Fan-out hub for WebSocket monitoring boards. Vitals/lab updates are coalesced
+per patient and scored in one batch per tick; subscribers only receive a push
+when a score or risk category changes meaningfully. Each connection has its
+own bounded outbox drained by its own task, so a slow board never delays the
+tick or other boards.
+"""
+
+import time
+import asyncio
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from fastapi import WebSocket
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Dict, Iterable, Set
+
+from app.prediction import engine, TARGETS, CONDITION_NAMES, RISK_LEVELS, categorize_risk_batch
+from app.audit import audit_log
+
+SCORE_CHANGE_THRESHOLD = 0.02
+FLUSH_INTERVAL_S = 0.1
+SEND_TIMEOUT_S = 2.0
+OUTBOX_SIZE = 256
+# Patients nobody subscribes to are forgotten after this long without updates
+IDLE_PATIENT_TTL_S = 300.0
+PRUNE_INTERVAL_S = 10.0
+
+
+class RiskStreamHub:
+    def __init__(self, threshold: float = SCORE_CHANGE_THRESHOLD, interval: float = FLUSH_INTERVAL_S):
+        self.threshold = threshold
+        self.interval = interval
+        self.subscribers: Dict[str, Set[WebSocket]] = defaultdict(set)
+        self.patients: Dict[str, Dict[str, Any]] = {}  # latest full input per patient
+        self.published: Dict[str, np.ndarray] = {}  # last scores pushed per patient
+        self.last_update: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._outboxes: Dict[WebSocket, asyncio.Queue] = {}
+        self._senders: Dict[WebSocket, asyncio.Task] = {}
+        self._last_prune = time.monotonic()
+        self._task = None
+        self.stats = {
+            "updates_received": 0,
+            "evaluations": 0,
+            "flushes": 0,
+            "pushes": 0,
+            "suppressed": 0,
+            "dropped": 0,
+            "slow_disconnects": 0,
+            "pruned": 0,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"✗ Risk stream flush failed: {e}")
+
+    def subscribe(self, ws: WebSocket, patient_ids: Iterable[str]):
+        for pid in patient_ids:
+            self.subscribers[pid].add(ws)
+            # Late joiners get the current state immediately
+            if pid in self.published:
+                self._enqueue(ws, self._message(pid, self.published[pid], None))
+
+    def unsubscribe(self, ws: WebSocket, patient_ids: Iterable[str] = None):
+        """Drop some subscriptions, or with no patient_ids the whole connection."""
+        for pid in list(self.subscribers if patient_ids is None else patient_ids):
+            subs = self.subscribers.get(pid)
+            if subs is None:
+                continue
+            subs.discard(ws)
+            if not subs:
+                del self.subscribers[pid]
+        if patient_ids is None:
+            self._outboxes.pop(ws, None)
+            sender = self._senders.pop(ws, None)
+            if sender is not None and sender is not asyncio.current_task():
+                sender.cancel()
+
+    def update(self, patient_id: str, patient_data: Dict[str, Any]):
+        """Record the latest full input for a patient; scored on the next tick."""
+        self.patients[patient_id] = patient_data
+        self.last_update[patient_id] = time.monotonic()
+        self._dirty.add(patient_id)
+        self.stats["updates_received"] += 1
+
+    async def flush(self):
+        """Score every patient updated since the last tick in a single batch."""
+        if time.monotonic() - self._last_prune >= PRUNE_INTERVAL_S:
+            self.prune()
+        if not self._dirty:
+            return
+        # Inputs as of this tick; updates arriving while we score wait for the next one
+        inputs = {pid: self.patients[pid] for pid in self._dirty}
+        dirty = list(inputs)
+        self._dirty.clear()
+
+        X = engine._prepare_batch(pd.DataFrame([inputs[pid] for pid in dirty]))
+        probs = await run_in_threadpool(engine.predict_proba_batch, X, True)
+        self.stats["evaluations"] += len(dirty)
+        self.stats["flushes"] += 1
+
+        for i, pid in enumerate(dirty):
+            scores = probs[:, i]
+            previous = self.published.get(pid)
+            message = self._message(pid, scores, previous)
+            # Every streamed score is audited, pushed or not
+            audit_log.record(pid, inputs[pid], message, engine.model_version)
+            if previous is not None and not self._changed(previous, scores):
+                self.stats["suppressed"] += 1
+                continue
+            self.published[pid] = scores
+
+            for ws in list(self.subscribers.get(pid, ())):
+                self._enqueue(ws, message)
+
+    def prune(self, ttl: float = IDLE_PATIENT_TTL_S) -> int:
+        """Forget patients with no subscribers and no updates for ttl seconds."""
+        now = time.monotonic()
+        self._last_prune = now
+        idle = [
+            pid for pid, seen in self.last_update.items()
+            if now - seen >= ttl and pid not in self.subscribers and pid not in self._dirty
+        ]
+        for pid in idle:
+            self.patients.pop(pid, None)
+            self.published.pop(pid, None)
+            del self.last_update[pid]
+        self.stats["pruned"] += len(idle)
+        return len(idle)
+
+    def _changed(self, previous: np.ndarray, scores: np.ndarray) -> bool:
+        if np.any(np.abs(scores - previous) >= self.threshold):
+            return True
+        return bool(np.any(categorize_risk_batch(scores) != categorize_risk_batch(previous)))
+
+    def _enqueue(self, ws: WebSocket, message: Dict[str, Any]):
+        outbox = self._outboxes.get(ws)
+        if outbox is None:
+            outbox = self._outboxes[ws] = asyncio.Queue(OUTBOX_SIZE)
+            self._senders[ws] = asyncio.get_running_loop().create_task(self._drain(ws, outbox))
+        if outbox.full():
+            # Boards only need the newest state; shed the oldest pending push
+            outbox.get_nowait()
+            self.stats["dropped"] += 1
+        outbox.put_nowait(message)
+
+    async def _drain(self, ws: WebSocket, outbox: asyncio.Queue):
+        while True:
+            message = await outbox.get()
+            try:
+                await asyncio.wait_for(ws.send_json(message), SEND_TIMEOUT_S)
+                self.stats["pushes"] += 1
+            except asyncio.TimeoutError:
+                # Board stopped reading; disconnect it rather than buffer forever
+                self.stats["slow_disconnects"] += 1
+                self.unsubscribe(ws)
+                try:
+                    await asyncio.wait_for(ws.close(code=1013), SEND_TIMEOUT_S)
+                except Exception:
+                    pass
+                return
+            except Exception:
+                # Connection went away; stop fanning out to it
+                self.unsubscribe(ws)
+                return
+
+    def _message(self, patient_id: str, scores: np.ndarray, previous) -> Dict[str, Any]:
+        categories = categorize_risk_batch(scores)
+        conditions = []
+        for t, target in enumerate(TARGETS):
+            conditions.append({
+                "condition": CONDITION_NAMES[target],
+                "condition_key": target,
+                "risk_score": round(float(scores[t]), 4),
+                "risk_category": RISK_LEVELS[categories[t]],
+                "change": None if previous is None else round(float(scores[t] - previous[t]), 4),
+            })
+        return {
+            "type": "risk_update",
+            "patient_id": patient_id,
+            "overall_risk_score": round(float(scores.max()), 4),
+            "overall_risk_category": RISK_LEVELS[categories.max()],
+            "conditions": conditions,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "patients": len(self.patients),
+            "subscribed_patients": len(self.subscribers),
+            "connections": len({ws for subs in self.subscribers.values() for ws in subs}),
+            "pending": len(self._dirty),
+            "queued": sum(q.qsize() for q in self._outboxes.values()),
+        }
+
+
+# Singleton hub
+risk_hub = RiskStreamHub()
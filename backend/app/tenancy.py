@@ -0,0 +1,140 @@
+"""
+MaternalGuard — Multi-Tenant Engine Pool
+One PredictionEngine per hospital site, loaded from that site's model directory
+on demand and evicted least-recently-used beyond a residency limit.
+"""
+
+import os
+import re
+import time
+import threading
+import numpy as np
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional
+
+from app.prediction import engine, PredictionEngine, MODEL_DIR, TARGETS, _shared_artifacts
+
+# Each tenant's retrained models live in TENANT_MODEL_ROOT/<tenant_id>/
+TENANT_MODEL_ROOT = os.environ.get("MATERNALGUARD_TENANT_ROOT", os.path.join(MODEL_DIR, "tenants"))
+DEFAULT_TENANT = "default"
+MAX_RESIDENT_TENANTS = int(os.environ.get("MATERNALGUARD_MAX_TENANTS", "4"))
+
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class UnknownTenantError(KeyError):
+    pass
+
+
+class EnginePool:
+    """LRU pool of tenant engines. The default tenant is the shared singleton engine."""
+
+    def __init__(self, root: str = TENANT_MODEL_ROOT, max_resident: int = MAX_RESIDENT_TENANTS):
+        self.root = root
+        self.max_resident = max_resident
+        self._engines: "OrderedDict[str, PredictionEngine]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._switch_ms = deque(maxlen=1000)
+        self._tenant_stats: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def model_dir(self, tenant_id: str) -> str:
+        if not TENANT_ID_PATTERN.match(tenant_id):
+            raise UnknownTenantError(f"Invalid tenant id: {tenant_id!r}")
+        path = os.path.join(self.root, tenant_id)
+        if not os.path.isfile(os.path.join(path, "feature_names.joblib")):
+            raise UnknownTenantError(f"Unknown tenant: {tenant_id}")
+        return path
+
+    def get(self, tenant_id: Optional[str]) -> PredictionEngine:
+        """Engine for a tenant, loading (and possibly evicting another) on a miss.
+
+        Loads run under a per-tenant lock, so a cold tenant only blocks
+        requests for that same tenant; the pool lock guards bookkeeping only.
+        """
+        if not tenant_id or tenant_id == DEFAULT_TENANT:
+            if not engine._loaded:
+                engine.load_models()
+            return engine
+
+        tenant_engine = self._resident(tenant_id)
+        if tenant_engine is not None:
+            return tenant_engine
+        model_dir = self.model_dir(tenant_id)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(tenant_id, threading.Lock())
+
+        with load_lock:
+            # Another request may have finished loading while we waited
+            tenant_engine = self._resident(tenant_id)
+            if tenant_engine is not None:
+                return tenant_engine
+
+            started = time.perf_counter()
+            tenant_engine = PredictionEngine(model_dir)
+            tenant_engine.load_models()
+            # Touch every target so the measured switch includes model and explainer builds
+            for target in TARGETS:
+                tenant_engine.models[target]
+                tenant_engine.explainers[target]
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            with self._lock:
+                self._engines[tenant_id] = tenant_engine
+                self.loads += 1
+                self._switch_ms.append(elapsed_ms)
+                stats = self._tenant_stats.setdefault(tenant_id, {"loads": 0})
+                stats["loads"] += 1
+                stats["last_load_ms"] = round(elapsed_ms, 2)
+
+                while len(self._engines) > self.max_resident:
+                    self._engines.popitem(last=False)
+                    self.evictions += 1
+            return tenant_engine
+
+    def _resident(self, tenant_id: str) -> Optional[PredictionEngine]:
+        with self._lock:
+            tenant_engine = self._engines.get(tenant_id)
+            if tenant_engine is not None:
+                self._engines.move_to_end(tenant_id)
+                self.hits += 1
+            return tenant_engine
+
+    def stats(self) -> Dict[str, Any]:
+        mb = 1024 * 1024
+        with self._lock:
+            switch = np.array(self._switch_ms) if self._switch_ms else None
+            tenants = {
+                tenant_id: {
+                    **self._tenant_stats.get(tenant_id, {}),
+                    "resident": tenant_id in self._engines,
+                    "model_version": self._engines[tenant_id].model_version if tenant_id in self._engines else None,
+                    "resident_mb": (
+                        round(self._engines[tenant_id].store.resident_bytes / mb, 3)
+                        if tenant_id in self._engines else 0.0
+                    ),
+                }
+                for tenant_id in self._tenant_stats
+            }
+            return {
+                "max_resident": self.max_resident,
+                "resident": list(self._engines),  # least recently used first
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "switch_ms": {
+                    "p50": round(float(np.percentile(switch, 50)), 2),
+                    "p95": round(float(np.percentile(switch, 95)), 2),
+                    "max": round(float(switch.max()), 2),
+                } if switch is not None else None,
+                "shared_artifacts": len(_shared_artifacts),
+                "default_tenant_mb": round(engine.store.resident_bytes / mb, 3) if engine.store else 0.0,
+                "tenants": tenants,
+            }
+
+
+# Singleton pool
+engine_pool = EnginePool()
@@ -0,0 +1,176 @@
+"""
+MaternalGuard — Pipeline Benchmark
+Runs generate → train → export at several dataset sizes, each in a fresh
+subprocess so peak RSS is measured per size, writes the results as JSON and
+compares them against a stored baseline to flag time, memory and AUC
+regressions.
+
+Usage (from backend/ml):
+    python benchmark_pipeline.py                         # 10k, 100k, 1M rows
+    python benchmark_pipeline.py --sizes 10000 100000
+    python benchmark_pipeline.py --update-baseline       # store this run as the baseline
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import contextlib
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+RESULTS_PATH = os.path.join(BENCH_DIR, "pipeline_results.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "pipeline_baseline.json")
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# Relative slowdown / memory growth, and absolute AUC drop, that count as regressions
+TIME_TOLERANCE = 0.20
+RSS_TOLERANCE = 0.20
+AUC_TOLERANCE = 0.01
+# Timings below this are too noisy to compare
+MIN_COMPARABLE_S = 0.5
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_size(n: int) -> dict:
+    """One benchmark run in this process: generate, train and export n rows into a temp dir."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from synthetic_data import generate_data
+    from train_model import train_models
+
+    with tempfile.TemporaryDirectory(prefix="mg-bench-") as data_dir:
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_data(n, data_dir)
+        generate_s = time.perf_counter() - started
+        generate_rss = _peak_rss_mb()
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            metrics = train_models(data_dir)
+        train_wall_s = time.perf_counter() - started
+
+        artifact_bytes = sum(
+            os.path.getsize(os.path.join(data_dir, f)) for f in os.listdir(data_dir) if f.endswith(".joblib")
+        )
+
+    targets = metrics["targets"]
+    return {
+        "rows": n,
+        "wall_s": generate_s + train_wall_s,
+        "generate_s": generate_s,
+        "train_wall_s": train_wall_s,
+        "train_s": sum(t["train_s"] for t in targets.values()),
+        "export_s": sum(t["export_s"] for t in targets.values()),
+        **metrics["timings"],
+        "peak_rss_mb": _peak_rss_mb(),
+        "generate_peak_rss_mb": generate_rss,
+        "artifact_mb": artifact_bytes / (1024 * 1024),
+        "targets": targets,
+    }
+
+
+def run_isolated(n: int) -> dict:
+    """run_size in a child interpreter, so each size starts from a clean heap."""
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", str(n)],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Benchmark worker for {n} rows failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """Regressions of results vs. baseline, as human-readable strings."""
+    regressions = []
+    for size, cur in results["sizes"].items():
+        base = baseline.get("sizes", {}).get(size)
+        if base is None:
+            continue
+        for key in ("wall_s", "generate_s", "train_s", "export_s"):
+            if base.get(key, 0) >= MIN_COMPARABLE_S and cur[key] > base[key] * (1 + TIME_TOLERANCE):
+                regressions.append(f"{size} rows: {key} {base[key]:.2f}s → {cur[key]:.2f}s")
+        if cur["peak_rss_mb"] > base["peak_rss_mb"] * (1 + RSS_TOLERANCE):
+            regressions.append(f"{size} rows: peak RSS {base['peak_rss_mb']:.0f}MB → {cur['peak_rss_mb']:.0f}MB")
+        for target, t in cur["targets"].items():
+            base_t = base["targets"].get(target)
+            if base_t is None:
+                continue
+            if t["auc"] < base_t["auc"] - AUC_TOLERANCE:
+                regressions.append(f"{size} rows: {target} AUC {base_t['auc']:.4f} → {t['auc']:.4f}")
+            if base_t["train_s"] >= MIN_COMPARABLE_S and t["train_s"] > base_t["train_s"] * (1 + TIME_TOLERANCE):
+                regressions.append(
+                    f"{size} rows: {target} train {base_t['train_s']:.2f}s → {t['train_s']:.2f}s"
+                )
+    return regressions
+
+
+def benchmark(sizes=DEFAULT_SIZES, update_baseline: bool = False) -> int:
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "sizes": {},
+    }
+
+    print(f"{'rows':>10} {'wall s':>8} {'gen s':>7} {'train s':>8} {'export s':>8} {'peak MB':>8}  AUC per target")
+    for n in sizes:
+        r = run_isolated(n)
+        results["sizes"][str(n)] = r
+        aucs = " ".join(f"{t['auc']:.3f}" for t in r["targets"].values())
+        print(
+            f"{n:>10} {r['wall_s']:>8.2f} {r['generate_s']:>7.2f} {r['train_s']:>8.2f} "
+            f"{r['export_s']:>8.2f} {r['peak_rss_mb']:>8.0f}  {aucs}"
+        )
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    with open(RESULTS_PATH, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results → {RESULTS_PATH}")
+
+    if update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Baseline updated → {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("No baseline stored yet (run with --update-baseline to create one)")
+        return 0
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline)
+    if regressions:
+        print(f"\n✗ {len(regressions)} regression(s) vs. baseline from {baseline.get('created_at')}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"✓ No regressions vs. baseline from {baseline.get('created_at')}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(run_size(args.worker)))
+    else:
+        sys.exit(benchmark(args.sizes, args.update_baseline))
@@ -0,0 +1,244 @@
+"""
+MaternalGuard — Model Evaluation
+AUC, PR-AUC and calibration (Brier, ECE), overall and per subgroup, with
+percentile bootstrap confidence intervals.
+
+Every metric is computed from per-cell counts, where a cell is a (score level,
+label) pair, so a whole block of resamples is scored with a few cumsums over a
+(resamples, levels) matrix:
+  - small test sets: resamples are drawn as index matrices over the rows and
+    binned to exact score levels;
+  - large test sets: scores are collapsed to quantile levels and each resample
+    is one multinomial draw over the cells, which has the same distribution as
+    resampling rows. The small discretization offset is removed by shifting
+    replicates by (exact estimate − discretized estimate).
+Targets are evaluated in parallel.
+
+Evaluate the saved models on their held-out split with:  python evaluation.py
+"""
+
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+N_BOOTSTRAP = 1000
+CI_LEVEL = 0.95
+CALIBRATION_BINS = 10
+# Above this many rows resamples are multinomial draws over quantile levels
+INDEX_MAX_ROWS = 20_000
+BOOTSTRAP_LEVELS = 2000
+# Max elements per (resamples x rows) or (resamples x cells) block
+BLOCK_ELEMENTS = 4_000_000
+SUBGROUP_MIN_ROWS = 30
+
+METRICS = ["auc", "pr_auc", "brier", "ece"]
+
+
+def _cells(y: np.ndarray, p: np.ndarray, max_levels: int = None):
+    """Assign rows to score levels; returns (level per row, per-level pos/neg counts and stats)."""
+    if max_levels is not None and len(p) > max_levels:
+        edges = np.unique(np.quantile(p, np.linspace(0, 1, max_levels + 1)[1:-1]))
+        level = np.searchsorted(edges, p, side="right")
+    else:
+        _, level = np.unique(p, return_inverse=True)
+    n_levels = int(level.max()) + 1
+    pos = np.bincount(level, weights=y, minlength=n_levels)
+    neg = np.bincount(level, minlength=n_levels) - pos
+    stats = {
+        # Mean score and squared error within each (level, label) cell
+        "p_pos": np.bincount(level, weights=p * y, minlength=n_levels) / np.maximum(pos, 1),
+        "p_neg": np.bincount(level, weights=p * (1 - y), minlength=n_levels) / np.maximum(neg, 1),
+        "loss_pos": np.bincount(level, weights=(1 - p) ** 2 * y, minlength=n_levels) / np.maximum(pos, 1),
+        "loss_neg": np.bincount(level, weights=p ** 2 * (1 - y), minlength=n_levels) / np.maximum(neg, 1),
+    }
+    mean_p = (stats["p_pos"] * pos + stats["p_neg"] * neg) / np.maximum(pos + neg, 1)
+    bins = np.minimum((mean_p * CALIBRATION_BINS).astype(int), CALIBRATION_BINS - 1)
+    stats["bin_onehot"] = np.eye(CALIBRATION_BINS)[bins]
+    return level, pos, neg, stats
+
+
+def _metrics(pos: np.ndarray, neg: np.ndarray, stats: dict) -> dict:
+    """Metrics for each row of (resamples, levels) positive/negative count matrices."""
+    n_pos, n_neg = pos.sum(axis=1), neg.sum(axis=1)
+    n = n_pos + n_neg
+    valid = (n_pos > 0) & (n_neg > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # AUC: each positive beats the negatives in lower levels, ties count half
+        neg_below = np.cumsum(neg, axis=1) - neg
+        auc = (pos * (neg_below + 0.5 * neg)).sum(axis=1) / (n_pos * n_neg)
+
+        # Average precision, thresholds at each level from the top
+        pos_desc, neg_desc = pos[:, ::-1], neg[:, ::-1]
+        tp, fp = np.cumsum(pos_desc, axis=1), np.cumsum(neg_desc, axis=1)
+        pr_auc = (pos_desc * (tp / np.maximum(tp + fp, 1))).sum(axis=1) / n_pos
+
+        brier = (pos * stats["loss_pos"] + neg * stats["loss_neg"]).sum(axis=1) / n
+        sum_y = pos @ stats["bin_onehot"]
+        sum_p = (pos * stats["p_pos"] + neg * stats["p_neg"]) @ stats["bin_onehot"]
+        ece = np.abs(sum_y - sum_p).sum(axis=1) / n
+
+    return {
+        "auc": np.where(valid, auc, np.nan),
+        "pr_auc": np.where(valid, pr_auc, np.nan),
+        "brier": brier,
+        "ece": ece,
+    }
+
+
+def _index_replicates(y, p, n_bootstrap, rng) -> dict:
+    """Resample rows via index matrices, scored on exact score levels."""
+    level, pos, neg, stats = _cells(y, p)
+    n, n_levels = len(y), len(pos)
+    cell = level * 2 + y.astype(np.int64)  # cell id = level*2 + label
+    block = max(1, BLOCK_ELEMENTS // max(n, 2 * n_levels))
+
+    reps = {m: [] for m in METRICS}
+    for start in range(0, n_bootstrap, block):
+        b = min(block, n_bootstrap - start)
+        idx = rng.integers(0, n, size=(b, n))
+        offsets = (np.arange(b) * 2 * n_levels)[:, None]
+        counts = np.bincount((cell[idx] + offsets).ravel(), minlength=b * 2 * n_levels)
+        counts = counts.reshape(b, n_levels, 2).astype(np.float64)
+        for m, v in _metrics(counts[:, :, 1], counts[:, :, 0], stats).items():
+            reps[m].append(v)
+    return {m: np.concatenate(v) for m, v in reps.items()}
+
+
+def _multinomial_replicates(y, p, n_bootstrap, rng, exact: dict) -> dict:
+    """Resample as multinomial draws over (quantile level, label) cells."""
+    _, pos, neg, stats = _cells(y, p, max_levels=BOOTSTRAP_LEVELS)
+    n, n_levels = len(y), len(pos)
+    probs = np.stack([neg, pos], axis=1).ravel() / n
+    block = max(1, BLOCK_ELEMENTS // (2 * n_levels))
+
+    # Shift replicates so the discretized estimate lines up with the exact one
+    discretized = _metrics(pos[None], neg[None], stats)
+    shift = {m: exact[m] - float(discretized[m][0]) for m in METRICS}
+
+    reps = {m: [] for m in METRICS}
+    for start in range(0, n_bootstrap, block):
+        b = min(block, n_bootstrap - start)
+        counts = rng.multinomial(n, probs, size=b).reshape(b, n_levels, 2).astype(np.float64)
+        for m, v in _metrics(counts[:, :, 1], counts[:, :, 0], stats).items():
+            reps[m].append(v + shift[m])
+    return {m: np.concatenate(v) for m, v in reps.items()}
+
+
+def bootstrap_metrics(y, p, n_bootstrap: int = N_BOOTSTRAP, ci: float = CI_LEVEL, rng=None) -> dict:
+    """Point estimates and percentile CIs for one set of labels and scores."""
+    y = np.asarray(y, dtype=np.float64)
+    p = np.asarray(p, dtype=np.float64)
+    rng = rng if rng is not None else np.random.default_rng()
+
+    _, pos, neg, stats = _cells(y, p)
+    exact = {m: float(v[0]) for m, v in _metrics(pos[None], neg[None], stats).items()}
+    if len(y) <= INDEX_MAX_ROWS:
+        reps = _index_replicates(y, p, n_bootstrap, rng)
+    else:
+        reps = _multinomial_replicates(y, p, n_bootstrap, rng, exact)
+
+    alpha = (1 - ci) / 2
+    result = {"n": len(y), "positives": int(y.sum())}
+    for m in METRICS:
+        values = reps[m][~np.isnan(reps[m])]
+        result[m] = {
+            "estimate": None if np.isnan(exact[m]) else round(exact[m], 4),
+            "ci_low": round(float(np.quantile(values, alpha)), 4) if len(values) else None,
+            "ci_high": round(float(np.quantile(values, 1 - alpha)), 4) if len(values) else None,
+        }
+    # Resamples without both classes have no AUC/PR-AUC
+    result["degenerate_resamples"] = int(np.isnan(reps["auc"]).sum())
+    return result
+
+
+def evaluate_target(y, p, groups: dict = None, n_bootstrap: int = N_BOOTSTRAP, ci: float = CI_LEVEL, seed=None) -> dict:
+    """Overall and per-subgroup bootstrap metrics for one target."""
+    rng = np.random.default_rng(seed)
+    y, p = np.asarray(y), np.asarray(p)
+    report = bootstrap_metrics(y, p, n_bootstrap, ci, rng)
+    report["subgroups"] = {}
+    for name, values in (groups or {}).items():
+        values = np.asarray(values)
+        report["subgroups"][name] = {
+            str(g): bootstrap_metrics(y[values == g], p[values == g], n_bootstrap, ci, rng)
+            for g in np.unique(values)
+            if (values == g).sum() >= SUBGROUP_MIN_ROWS
+        }
+    return report
+
+
+def evaluate_predictions(
+    y_true: dict,
+    y_prob: dict,
+    groups: dict = None,
+    n_bootstrap: int = N_BOOTSTRAP,
+    ci: float = CI_LEVEL,
+    seed: int = 42,
+    n_jobs: int = -1,
+) -> dict:
+    """Bootstrap evaluation of every target ({target: labels}, {target: scores}), in parallel."""
+    targets = list(y_true)
+    seeds = np.random.SeedSequence(seed).spawn(len(targets))
+    started = time.perf_counter()
+    reports = Parallel(n_jobs=min(n_jobs if n_jobs > 0 else os.cpu_count() or 1, len(targets)))(
+        delayed(evaluate_target)(y_true[t], y_prob[t], groups, n_bootstrap, ci, s)
+        for t, s in zip(targets, seeds)
+    )
+    return {
+        "n_bootstrap": n_bootstrap,
+        "ci_level": ci,
+        "seed": seed,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "targets": dict(zip(targets, reports)),
+    }
+
+
+def print_report(report: dict, labels: dict = None):
+    pct = round(report["ci_level"] * 100)
+    print(f"\nBootstrap evaluation ({report['n_bootstrap']} resamples, {pct}% CI, {report['elapsed_s']}s)")
+    for target, r in report["targets"].items():
+        print(f"\n{(labels or {}).get(target, target)} — {r['positives']}/{r['n']} positives")
+        for m in METRICS:
+            e = r[m]
+            if e["estimate"] is None:
+                print(f"  {m:<7} n/a (single class)")
+            else:
+                print(f"  {m:<7} {e['estimate']:.4f}  [{e['ci_low']:.4f}, {e['ci_high']:.4f}]")
+
+
+def save_report(report: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Evaluation report → {path}")
+
+
+if __name__ == "__main__":
+    import joblib
+    from sklearn.model_selection import train_test_split
+    from train_model import TARGETS, TARGET_LABELS, CATEGORICAL_FEATURES
+
+    data_dir = os.path.join(os.path.dirname(__file__), "saved_models")
+    df = pd.read_csv(os.path.join(data_dir, "synthetic_patients.csv"))
+    feature_names = joblib.load(os.path.join(data_dir, "feature_names.joblib"))
+    encoders = joblib.load(os.path.join(data_dir, "label_encoders.joblib"))
+
+    X = df[feature_names].copy()
+    for col in CATEGORICAL_FEATURES:
+        X[col] = encoders[col].transform(X[col].astype(str))
+    # Same held-out split as train_models
+    _, X_test, _, idx_test = train_test_split(X, np.arange(len(X)), test_size=0.2, random_state=42)
+    test = df.iloc[idx_test]
+
+    y_prob = {
+        t: joblib.load(os.path.join(data_dir, f"{t}_model.joblib")).predict_proba(X_test)[:, 1] for t in TARGETS
+    }
+    report = evaluate_predictions(
+        {t: test[t].to_numpy() for t in TARGETS},
+        y_prob,
+        groups={"race_ethnicity": test["race_ethnicity"].to_numpy(), "insurance_type": test["insurance_type"].to_numpy()},
+    )
+    print_report(report, TARGET_LABELS)
+    save_report(report, os.path.join(data_dir, "evaluation_report.json"))
@@ -0,0 +1,159 @@
+"""
+MaternalGuard — Load Driver
+Replays an endless synthetic patient stream against /api/predict at a target
+rate. Arrivals are open-loop: request i is due at start + i/qps (or on a
+Poisson schedule) whether or not earlier requests have finished, and latency
+is measured from that scheduled time, so a slow server shows up as queueing
+delay instead of silently lowering the offered load.
+
+Usage (from backend/ml, with the API running):
+    python load_driver.py --qps 50 --duration 60
+    python load_driver.py --url http://localhost:8000 --qps 200 --poisson --out results.json
+"""
+
+import json
+import time
+import argparse
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from synthetic_data import patient_stream
+
+DEFAULT_URL = "http://localhost:8000"
+PERCENTILES = [50, 90, 95, 99, 99.9]
+
+
+class LoadDriver:
+    def __init__(
+        self,
+        url: str = DEFAULT_URL,
+        qps: float = 50.0,
+        duration: float = 60.0,
+        seed: Optional[int] = None,
+        concurrency: int = 64,
+        poisson: bool = False,
+        timeout: float = 30.0,
+        headers: Optional[dict] = None,
+    ):
+        self.endpoint = url.rstrip("/") + "/api/predict"
+        self.qps = qps
+        self.duration = duration
+        self.seed = seed
+        self.concurrency = concurrency
+        self.poisson = poisson
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self._lock = threading.Lock()
+        self._latency_ms = []   # scheduled send → response
+        self._service_ms = []   # actual send → response
+        self._lag_ms = []       # scheduled send → actual send
+        self.errors = {}
+
+    def _send(self, body: bytes, scheduled: float):
+        sent = time.perf_counter()
+        request = urllib.request.Request(self.endpoint, data=body, headers=self.headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+            error = None
+        except urllib.error.HTTPError as e:
+            error = f"HTTP {e.code}"
+        except (urllib.error.URLError, OSError) as e:
+            error = type(getattr(e, "reason", e)).__name__
+        done = time.perf_counter()
+
+        with self._lock:
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+                return
+            self._latency_ms.append((done - scheduled) * 1000)
+            self._service_ms.append((done - sent) * 1000)
+            self._lag_ms.append((sent - scheduled) * 1000)
+
+    def run(self) -> dict:
+        n_requests = int(self.qps * self.duration)
+        rng = np.random.RandomState(self.seed)
+        if self.poisson:
+            offsets = np.cumsum(rng.exponential(1.0 / self.qps, n_requests))
+        else:
+            offsets = np.arange(n_requests) / self.qps
+        patients = patient_stream(seed=self.seed)
+
+        pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix="load")
+        start = time.perf_counter() + 0.1
+        for offset in offsets:
+            body = json.dumps(next(patients)).encode()
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(self._send, body, scheduled)
+        pool.shutdown(wait=True)
+        elapsed = time.perf_counter() - start
+        return self.report(n_requests, elapsed)
+
+    def report(self, n_requests: int, elapsed: float) -> dict:
+        def summary(values):
+            if not values:
+                return None
+            arr = np.array(values)
+            return {
+                **{f"p{p:g}": round(float(np.percentile(arr, p)), 2) for p in PERCENTILES},
+                "mean": round(float(arr.mean()), 2),
+                "max": round(float(arr.max()), 2),
+            }
+
+        ok = len(self._latency_ms)
+        return {
+            "endpoint": self.endpoint,
+            "target_qps": self.qps,
+            "arrivals": "poisson" if self.poisson else "uniform",
+            "requests": n_requests,
+            "ok": ok,
+            "errors": dict(self.errors),
+            "elapsed_s": round(elapsed, 2),
+            "achieved_qps": round(ok / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": summary(self._latency_ms),
+            "service_ms": summary(self._service_ms),
+            "send_lag_ms": summary(self._lag_ms),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--qps", type=float, default=50.0)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=64, help="max requests in flight")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times")
+    parser.add_argument("--tenant", default=None, help="X-Tenant-ID header")
+    parser.add_argument("--deadline-ms", type=float, default=None, help="X-Deadline-Ms header")
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    args = parser.parse_args()
+
+    headers = {}
+    if args.tenant:
+        headers["X-Tenant-ID"] = args.tenant
+    if args.deadline_ms is not None:
+        headers["X-Deadline-Ms"] = str(args.deadline_ms)
+
+    driver = LoadDriver(
+        args.url, args.qps, args.duration, args.seed, args.concurrency, args.poisson, headers=headers
+    )
+    print(f"Offering {args.qps:g} req/s for {args.duration:g}s → {driver.endpoint}")
+    result = driver.run()
+
+    print(f"✓ {result['ok']}/{result['requests']} ok at {result['achieved_qps']} req/s"
+          + (f", errors: {result['errors']}" if result["errors"] else ""))
+    for key in ("latency_ms", "service_ms", "send_lag_ms"):
+        if result[key]:
+            print(f"  {key:<12} " + "  ".join(f"{k}={v}" for k, v in result[key].items()))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"✓ Report → {args.out}")
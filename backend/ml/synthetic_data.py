@@ -1,6 +1,7 @@
 """
 MaternalGuard — Synthetic Training Data Generator
-Generates 10,000 clinically-realistic postpartum patient records.
+Generates 10,000 clinically-realistic postpartum patient records, or an
+endless seeded stream of them for load testing (patient_stream).
 """
 
 import numpy as np
@@ -10,79 +11,86 @@ import os
 np.random.seed(42)
 N = 10_000
 
+RACE_ETHNICITIES = ["White", "Black", "Hispanic", "Asian", "Native American", "Other"]
+INSURANCE_TYPES = ["Private", "Medicaid", "Medicare", "Uninsured"]
+DELIVERY_MODES = ["Vaginal", "Cesarean", "Assisted Vaginal"]
+OUTCOMES = ["pph_outcome", "preeclampsia_postpartum", "sepsis_outcome",
+            "cardiomyopathy_outcome", "ppd_outcome"]
+
 
 def sigmoid(x):
     return 1 / (1 + np.exp(-x))
 
 
-def generate_data():
+def sample_patients(n: int, rng=np.random) -> pd.DataFrame:
+    """Draw n patient records with outcomes from `rng` (a RandomState, or the seeded global one)."""
     # ── DEMOGRAPHICS ──
-    age = np.random.randint(15, 51, N)
-    race_ethnicity = np.random.choice(
-        ["White", "Black", "Hispanic", "Asian", "Native American", "Other"],
-        N, p=[0.40, 0.18, 0.22, 0.10, 0.03, 0.07],
+    age = rng.randint(15, 51, n)
+    race_ethnicity = rng.choice(
+        RACE_ETHNICITIES,
+        n, p=[0.40, 0.18, 0.22, 0.10, 0.03, 0.07],
     )
-    insurance_type = np.random.choice(
-        ["Private", "Medicaid", "Medicare", "Uninsured"],
-        N, p=[0.45, 0.40, 0.05, 0.10],
+    insurance_type = rng.choice(
+        INSURANCE_TYPES,
+        n, p=[0.45, 0.40, 0.05, 0.10],
     )
-    bmi_pre_pregnancy = np.clip(np.random.normal(27, 6, N), 16, 55).round(1)
+    bmi_pre_pregnancy = np.clip(rng.normal(27, 6, n), 16, 55).round(1)
 
     # ── OBSTETRIC ──
-    gravidity = np.random.choice(range(1, 10), N, p=[0.25, 0.30, 0.20, 0.12, 0.06, 0.03, 0.02, 0.01, 0.01])
-    parity = np.minimum(gravidity - np.random.randint(0, 2, N), gravidity).clip(0)
-    previous_cesarean = (np.random.random(N) < 0.25).astype(int)
-    previous_pph = (np.random.random(N) < 0.05).astype(int)
-    previous_preeclampsia = (np.random.random(N) < 0.06).astype(int)
-    gestational_age_at_delivery = np.clip(np.random.normal(39, 2, N).astype(int), 24, 42)
-    multiple_gestation = (np.random.random(N) < 0.03).astype(int)
-    mode_of_delivery = np.random.choice(
-        ["Vaginal", "Cesarean", "Assisted Vaginal"],
-        N, p=[0.60, 0.32, 0.08],
+    gravidity = rng.choice(range(1, 10), n, p=[0.25, 0.30, 0.20, 0.12, 0.06, 0.03, 0.02, 0.01, 0.01])
+    parity = np.minimum(gravidity - rng.randint(0, 2, n), gravidity).clip(0)
+    previous_cesarean = (rng.random(n) < 0.25).astype(int)
+    previous_pph = (rng.random(n) < 0.05).astype(int)
+    previous_preeclampsia = (rng.random(n) < 0.06).astype(int)
+    gestational_age_at_delivery = np.clip(rng.normal(39, 2, n).astype(int), 24, 42)
+    multiple_gestation = (rng.random(n) < 0.03).astype(int)
+    mode_of_delivery = rng.choice(
+        DELIVERY_MODES,
+        n, p=[0.60, 0.32, 0.08],
     )
 
     # ── VITALS ──
-    systolic_bp = np.clip(np.random.normal(120, 15, N), 85, 200).astype(int)
-    diastolic_bp = np.clip(np.random.normal(75, 10, N), 50, 130).astype(int)
-    heart_rate = np.clip(np.random.normal(82, 12, N), 50, 150).astype(int)
-    temperature = np.clip(np.random.normal(98.6, 0.5, N), 96.0, 104.0).round(1)
-    respiratory_rate = np.clip(np.random.normal(18, 3, N), 10, 35).astype(int)
+    systolic_bp = np.clip(rng.normal(120, 15, n), 85, 200).astype(int)
+    diastolic_bp = np.clip(rng.normal(75, 10, n), 50, 130).astype(int)
+    heart_rate = np.clip(rng.normal(82, 12, n), 50, 150).astype(int)
+    temperature = np.clip(rng.normal(98.6, 0.5, n), 96.0, 104.0).round(1)
+    respiratory_rate = np.clip(rng.normal(18, 3, n), 10, 35).astype(int)
 
     # ── LABS ──
-    hemoglobin = np.clip(np.random.normal(12.0, 1.5, N), 5.0, 17.0).round(1)
-    platelet_count = np.clip(np.random.normal(250, 60, N), 50, 500).astype(int)
-    white_blood_cell_count = np.clip(np.random.normal(10, 3, N), 3.0, 30.0).round(1)
-    creatinine = np.clip(np.random.normal(0.8, 0.2, N), 0.3, 3.0).round(2)
-    ast_level = np.clip(np.random.normal(25, 12, N), 8, 200).astype(int)
-    alt_level = np.clip(np.random.normal(22, 10, N), 5, 200).astype(int)
-    blood_glucose = np.clip(np.random.normal(100, 20, N), 50, 300).astype(int)
+    hemoglobin = np.clip(rng.normal(12.0, 1.5, n), 5.0, 17.0).round(1)
+    platelet_count = np.clip(rng.normal(250, 60, n), 50, 500).astype(int)
+    white_blood_cell_count = np.clip(rng.normal(10, 3, n), 3.0, 30.0).round(1)
+    creatinine = np.clip(rng.normal(0.8, 0.2, n), 0.3, 3.0).round(2)
+    ast_level = np.clip(rng.normal(25, 12, n), 8, 200).astype(int)
+    alt_level = np.clip(rng.normal(22, 10, n), 5, 200).astype(int)
+    blood_glucose = np.clip(rng.normal(100, 20, n), 50, 300).astype(int)
 
     # ── MEDICAL HISTORY ──
-    chronic_hypertension = (np.random.random(N) < 0.08).astype(int)
-    pregestational_diabetes = (np.random.random(N) < 0.04).astype(int)
-    gestational_diabetes = (np.random.random(N) < 0.10).astype(int)
-    anemia_during_pregnancy = (np.random.random(N) < 0.12).astype(int)
-    uterine_fibroids = (np.random.random(N) < 0.05).astype(int)
-    placenta_previa = (np.random.random(N) < 0.03).astype(int)
-    placental_abruption = (np.random.random(N) < 0.01).astype(int)
-    chorioamnionitis = (np.random.random(N) < 0.03).astype(int)
-    autoimmune_disorder = (np.random.random(N) < 0.03).astype(int)
+    chronic_hypertension = (rng.random(n) < 0.08).astype(int)
+    pregestational_diabetes = (rng.random(n) < 0.04).astype(int)
+    gestational_diabetes = (rng.random(n) < 0.10).astype(int)
+    anemia_during_pregnancy = (rng.random(n) < 0.12).astype(int)
+    uterine_fibroids = (rng.random(n) < 0.05).astype(int)
+    placenta_previa = (rng.random(n) < 0.03).astype(int)
+    placental_abruption = (rng.random(n) < 0.01).astype(int)
+    chorioamnionitis = (rng.random(n) < 0.03).astype(int)
+    autoimmune_disorder = (rng.random(n) < 0.03).astype(int)
 
     # ── DELIVERY ──
-    labor_induction = (np.random.random(N) < 0.30).astype(int)
-    labor_augmentation_oxytocin = (np.random.random(N) < 0.20).astype(int)
-    epidural_anesthesia = (np.random.random(N) < 0.60).astype(int)
-    general_anesthesia = (np.random.random(N) < 0.05).astype(int)
-    perineal_laceration_degree = np.random.choice(range(5), N, p=[0.40, 0.30, 0.20, 0.08, 0.02])
-    estimated_blood_loss_ml = np.clip(np.random.lognormal(6.2, 0.5, N), 100, 5000).astype(int)
-    newborn_weight_g = np.clip(np.random.normal(3300, 500, N), 500, 5500).astype(int)
-    labor_duration_hours = np.clip(np.random.lognormal(2.2, 0.6, N), 0.5, 48).round(1)
+    labor_induction = (rng.random(n) < 0.30).astype(int)
+    labor_augmentation_oxytocin = (rng.random(n) < 0.20).astype(int)
+    epidural_anesthesia = (rng.random(n) < 0.60).astype(int)
+    general_anesthesia = (rng.random(n) < 0.05).astype(int)
+    perineal_laceration_degree = rng.choice(range(5), n, p=[0.40, 0.30, 0.20, 0.08, 0.02])
+    estimated_blood_loss_ml = np.clip(rng.lognormal(6.2, 0.5, n), 100, 5000).astype(int)
+    newborn_weight_g = np.clip(rng.normal(3300, 500, n), 500, 5500).astype(int)
+    labor_duration_hours = np.clip(rng.lognormal(2.2, 0.6, n), 0.5, 48).round(1)
 
     # ── SOCIAL ──
-    smoking_during_pregnancy = (np.random.random(N) < 0.08).astype(int)
-    substance_use = (np.random.random(N) < 0.04).astype(int)
-    prenatal_visits_count = np.clip(np.random.normal(10, 3, N), 0, 20).astype(int)
-    distance_to_hospital_miles = np.clip(np.random.lognormal(2.5, 0.8, N), 0.5, 100).round(1)
+    smoking_during_pregnancy = (rng.random(n) < 0.08).astype(int)
+    substance_use = (rng.random(n) < 0.04).astype(int)
+    prenatal_visits_count = np.clip(rng.normal(10, 3, n), 0, 20).astype(int)
+    distance_to_hospital_miles = np.clip(rng.lognormal(2.5, 0.8, n), 0.5, 100).round(1)
 
     # ── TARGET OUTCOMES ──
     is_cesarean = (mode_of_delivery == "Cesarean").astype(float)
@@ -104,9 +112,9 @@ def generate_data():
         + 0.2 * (bmi_pre_pregnancy > 35).astype(float)
         + 0.3 * general_anesthesia
         + 0.2 * (perineal_laceration_degree >= 3).astype(float)
-        + np.random.normal(0, 0.3, N)
+        + rng.normal(0, 0.3, n)
     )
-    pph_outcome = (np.random.random(N) < sigmoid(pph_logit)).astype(int)
+    pph_outcome = (rng.random(n) < sigmoid(pph_logit)).astype(int)
 
     # Preeclampsia (~2% base rate)
     preeclampsia_logit = (
@@ -122,9 +130,9 @@ def generate_data():
         + 0.4 * (creatinine > 1.1).astype(float)
         + 0.3 * (platelet_count < 150).astype(float)
         + 0.3 * autoimmune_disorder
-        + np.random.normal(0, 0.3, N)
+        + rng.normal(0, 0.3, n)
     )
-    preeclampsia_postpartum = (np.random.random(N) < sigmoid(preeclampsia_logit)).astype(int)
+    preeclampsia_postpartum = (rng.random(n) < sigmoid(preeclampsia_logit)).astype(int)
 
     # Sepsis (~1% base rate)
     sepsis_logit = (
@@ -139,9 +147,9 @@ def generate_data():
         + 0.3 * substance_use
         + 0.2 * anemia_during_pregnancy
         + 0.3 * (perineal_laceration_degree >= 3).astype(float)
-        + np.random.normal(0, 0.3, N)
+        + rng.normal(0, 0.3, n)
     )
-    sepsis_outcome = (np.random.random(N) < sigmoid(sepsis_logit)).astype(int)
+    sepsis_outcome = (rng.random(n) < sigmoid(sepsis_logit)).astype(int)
 
     # Cardiomyopathy (~0.1% base rate)
     cardiomyopathy_logit = (
@@ -155,9 +163,9 @@ def generate_data():
         + 0.3 * previous_preeclampsia
         + 0.3 * anemia_during_pregnancy
         + 0.2 * smoking_during_pregnancy
-        + np.random.normal(0, 0.3, N)
+        + rng.normal(0, 0.3, n)
     )
-    cardiomyopathy_outcome = (np.random.random(N) < sigmoid(cardiomyopathy_logit)).astype(int)
+    cardiomyopathy_outcome = (rng.random(n) < sigmoid(cardiomyopathy_logit)).astype(int)
 
     # PPD (~15% base rate)
     ppd_logit = (
@@ -173,9 +181,9 @@ def generate_data():
         + 0.3 * is_cesarean
         + 0.2 * (parity == 0).astype(float)
         + 0.2 * multiple_gestation
-        + np.random.normal(0, 0.4, N)
+        + rng.normal(0, 0.4, n)
     )
-    ppd_outcome = (np.random.random(N) < sigmoid(ppd_logit)).astype(int)
+    ppd_outcome = (rng.random(n) < sigmoid(ppd_logit)).astype(int)
 
     df = pd.DataFrame({
         # Demographics
@@ -237,20 +245,52 @@ def generate_data():
         "cardiomyopathy_outcome": cardiomyopathy_outcome,
         "ppd_outcome": ppd_outcome,
     })
+    return df
+
+
+def generate_data(n: int = N, out_dir: str = None):
+    """Generate n records and write them to out_dir (default: saved_models/)."""
+    df = sample_patients(n)
 
-    out_dir = os.path.join(os.path.dirname(__file__), "saved_models")
+    out_dir = out_dir or os.path.join(os.path.dirname(__file__), "saved_models")
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, "synthetic_patients.csv")
     df.to_csv(out_path, index=False)
 
     print(f"✓ Generated {len(df)} records → {out_path}")
     print(f"\nOutcome prevalence:")
-    for col in ["pph_outcome", "preeclampsia_postpartum", "sepsis_outcome",
-                 "cardiomyopathy_outcome", "ppd_outcome"]:
+    for col in OUTCOMES:
         print(f"  {col}: {df[col].mean():.2%}")
 
     return df
 
 
+def patient_stream(seed: int = None, batch_size: int = 256, encoded: bool = False, outcomes: bool = False):
+    """Endless lazy stream of patients, drawn batch by batch from the same distributions.
+
+    Yields one dict per patient (the /api/predict payload), or with
+    encoded=True one DataFrame per batch with categoricals as label-encoder
+    codes, in training feature order. Memory stays constant at one batch;
+    each seed gives a reproducible stream independent of the global seed.
+    """
+    rng = np.random.RandomState(seed)
+    categories = {
+        "race_ethnicity": sorted(RACE_ETHNICITIES),
+        "insurance_type": sorted(INSURANCE_TYPES),
+        "mode_of_delivery": sorted(DELIVERY_MODES),
+    }
+    while True:
+        df = sample_patients(batch_size, rng)
+        if not outcomes:
+            df = df.drop(columns=OUTCOMES)
+        if encoded:
+            # LabelEncoder classes are sorted, so sorted categories give the same codes
+            for col, classes in categories.items():
+                df[col] = pd.Categorical(df[col], categories=classes).codes.astype(np.int64)
+            yield df
+        else:
+            yield from df.to_dict("records")
+
+
 if __name__ == "__main__":
     generate_data()
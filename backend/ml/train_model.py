@@ -4,6 +4,7 @@ Trains 5 XGBoost classifiers (one per postpartum outcome) and saves them.
 """
 
 import os
+import time
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
@@ -14,6 +15,8 @@ from sklearn.metrics import roc_auc_score
 from xgboost import XGBClassifier
 import joblib
 
+from evaluation import evaluate_predictions, print_report, save_report
+
 TARGETS = [
     "pph_outcome",
     "preeclampsia_postpartum",
@@ -32,17 +35,51 @@ TARGET_LABELS = {
 
 CATEGORICAL_FEATURES = ["race_ethnicity", "insurance_type", "mode_of_delivery"]
 
-
-def train_models():
-    data_dir = os.path.join(os.path.dirname(__file__), "saved_models")
+DRIFT_BINS = 10
+
+
+def build_drift_baseline(X: pd.DataFrame, n_bins: int = DRIFT_BINS) -> dict:
+    """Per-feature bin edges and training proportions for live drift monitoring.
+
+    Low-cardinality features get one bin per observed value; continuous ones
+    get quantile bins. Inner edges are padded with +inf to a common width so
+    live inputs can be binned for all features in one vectorized comparison.
+    """
+    edges = np.full((X.shape[1], n_bins - 1), np.inf)
+    proportions = np.zeros((X.shape[1], n_bins))
+    for j, col in enumerate(X.columns):
+        values = X[col].to_numpy(dtype=float)
+        uniques = np.unique(values)
+        if len(uniques) <= n_bins:
+            inner = (uniques[:-1] + uniques[1:]) / 2
+        else:
+            inner = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        edges[j, :len(inner)] = inner
+        bins = (values[:, None] > edges[j][None, :]).sum(axis=1)
+        proportions[j] = np.bincount(bins, minlength=n_bins) / len(values)
+    return {
+        "feature_names": list(X.columns),
+        "n_bins": n_bins,
+        "edges": edges,
+        "proportions": proportions,
+        "n_samples": len(X),
+    }
+
+
+def train_models(data_dir: str = None) -> dict:
+    """Train and export all models into data_dir; returns per-target AUC and phase timings."""
+    data_dir = data_dir or os.path.join(os.path.dirname(__file__), "saved_models")
     csv_path = os.path.join(data_dir, "synthetic_patients.csv")
+    timings = {}
 
     if not os.path.exists(csv_path):
         print("Data file not found. Generating synthetic data first...")
         from synthetic_data import generate_data
-        generate_data()
+        generate_data(out_dir=data_dir)
 
+    started = time.perf_counter()
     df = pd.read_csv(csv_path)
+    timings["load_s"] = time.perf_counter() - started
     print(f"Loaded {len(df)} records from {csv_path}\n")
 
     # Separate features and targets
@@ -51,6 +88,7 @@ def train_models():
     y_dict = {t: df[t] for t in TARGETS}
 
     # Encode categoricals
+    started = time.perf_counter()
     label_encoders = {}
     for col in CATEGORICAL_FEATURES:
         le = LabelEncoder()
@@ -61,6 +99,10 @@ def train_models():
     joblib.dump(label_encoders, os.path.join(data_dir, "label_encoders.joblib"))
     joblib.dump(feature_cols, os.path.join(data_dir, "feature_names.joblib"))
 
+    # Training-distribution baseline for the live drift monitor
+    joblib.dump(build_drift_baseline(X), os.path.join(data_dir, "drift_baseline.joblib"))
+    timings["prepare_s"] = time.perf_counter() - started
+
     # Train-test split
     X_train, X_test, indices_train, indices_test = train_test_split(
         X, np.arange(len(X)), test_size=0.2, random_state=42
@@ -70,6 +112,8 @@ def train_models():
     print("TRAINING RESULTS")
     print("=" * 60)
 
+    results = {}
+    test_labels, test_scores = {}, {}
     for target_name in TARGETS:
         y = y_dict[target_name]
         y_train = y.iloc[indices_train]
@@ -91,7 +135,9 @@ def train_models():
             verbosity=0,
         )
 
+        started = time.perf_counter()
         model.fit(X_train, y_train)
+        train_s = time.perf_counter() - started
 
         # Evaluate
         y_pred_proba = model.predict_proba(X_test)[:, 1]
@@ -100,6 +146,9 @@ def train_models():
         except ValueError:
             auc = 0.0
 
+        test_labels[target_name] = y_test.to_numpy()
+        test_scores[target_name] = y_pred_proba
+
         label = TARGET_LABELS[target_name]
         print(f"\n{label} ({target_name})")
         print(f"  Train positives: {y_train.sum()}/{len(y_train)} ({y_train.mean():.2%})")
@@ -107,14 +156,36 @@ def train_models():
         print(f"  AUC-ROC: {auc:.4f}")
 
         # Save model
+        started = time.perf_counter()
         model_path = os.path.join(data_dir, f"{target_name}_model.joblib")
         joblib.dump(model, model_path)
         print(f"  Saved → {model_path}")
 
+        results[target_name] = {
+            "auc": float(auc),
+            "train_s": train_s,
+            "export_s": time.perf_counter() - started,
+            "positives": int(y_train.sum()),
+        }
+
+    # Bootstrap CIs: single-split AUCs on rare outcomes are too noisy to read alone
+    started = time.perf_counter()
+    test_df = df.iloc[indices_test]
+    evaluation = evaluate_predictions(
+        test_labels,
+        test_scores,
+        groups={col: test_df[col].to_numpy() for col in ["race_ethnicity", "insurance_type"]},
+    )
+    print_report(evaluation, TARGET_LABELS)
+    save_report(evaluation, os.path.join(data_dir, "evaluation_report.json"))
+    timings["evaluate_s"] = time.perf_counter() - started
+
     print("\n" + "=" * 60)
     print("All models trained and saved successfully!")
     print("=" * 60)
 
+    return {"rows": len(df), "timings": timings, "targets": results}
+
 
 if __name__ == "__main__":
     train_models()